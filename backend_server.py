@@ -1,11 +1,17 @@
+import json
 import os
+import random
+import threading
 from datetime import datetime, UTC
-from typing import Optional, List, Dict
-from contextlib import suppress
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial, wraps
 import time
 
 import instastorysaver
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 app = Flask(__name__)
@@ -14,38 +20,107 @@ CORS(app)
 DOWNLOAD_DIR = os.path.join(os.path.expanduser('~'), 'Pictures', 'IGStoryDownloader')
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
-_LOADER: Optional[instastorysaver.Instaloader] = None
+# Loaders by account ('' for anonymous access), each with its own session, rate controller and session file, so
+# that switching accounts keeps the other sessions warm
+_LOADERS: Dict[str, instastorysaver.Instaloader] = {}
+_ACCOUNT_LOCKS: Dict[str, threading.RLock] = {}
+_POOL_LOCK = threading.Lock()
+# Account used by requests that do not name one
 _LOGIN_USER: Optional[str] = None
 
+# Global media bandwidth cap; survives loader resets and can be changed at runtime via /bandwidth
+_BANDWIDTH = instastorysaver.BandwidthLimiter()
 
-def get_loader() -> instastorysaver.Instaloader:
-    global _LOADER
-    if _LOADER is None:
-        _LOADER = instastorysaver.Instaloader(
-            download_comments=False,
-            save_metadata=False,
-            compress_json=False,
-            download_video_thumbnails=False,
-            post_metadata_txt_pattern="",
-            storyitem_metadata_txt_pattern=""
-        )
-    return _LOADER
+WATCHLIST_FILE = os.path.join(DOWNLOAD_DIR, 'watchlist.json')
+MIN_WATCH_INTERVAL = 300
+_WATCHLIST_LOCK = threading.Lock()
+_WATCHLIST_CHANGED = threading.Event()
+_WATCHER: Optional[threading.Thread] = None
 
 
-def reset_loader():
-    """Reset the loader instance to allow login with different accounts."""
-    global _LOADER, _LOGIN_USER
-    _LOADER = None
-    _LOGIN_USER = None
+# Story files are prefixed to tell them apart from posts
+STORY_FILENAME_PATTERN = 'story_{date_utc}_UTC'
 
 
-def _cleanup(folder: str):
-    if not os.path.isdir(folder):
-        return
-    for f in os.listdir(folder):
-        if not (f.lower().endswith('.jpg') or f.lower().endswith('.mp4')):
-            with suppress(Exception):
-                os.remove(os.path.join(folder, f))
+def new_loader() -> instastorysaver.Instaloader:
+    return instastorysaver.Instaloader(
+        download_comments=False,
+        save_metadata=False,
+        compress_json=False,
+        download_video_thumbnails=False,
+        post_metadata_txt_pattern="",
+        storyitem_metadata_txt_pattern="",
+        bandwidth_limiter=_BANDWIDTH
+    )
+
+
+def _account_key(account: Optional[str]) -> str:
+    return (_LOGIN_USER if account is None else account) or ''
+
+
+def get_loader(account: Optional[str] = None) -> instastorysaver.Instaloader:
+    """The pooled loader of the given account, by default the account logged in last."""
+    key = _account_key(account)
+    with _POOL_LOCK:
+        if key not in _LOADERS:
+            _LOADERS[key] = new_loader()
+        return _LOADERS[key]
+
+
+def find_loader(account: Optional[str] = None) -> Optional[instastorysaver.Instaloader]:
+    """The pooled loader of the given account like get_loader(), or None rather than creating one."""
+    key = _account_key(account)
+    with _POOL_LOCK:
+        return _LOADERS.get(key)
+
+
+def add_loader(account: str, loader: instastorysaver.Instaloader):
+    """Put a loader into the pool, replacing the account's previous one."""
+    with _POOL_LOCK:
+        _LOADERS[account] = loader
+
+
+def logged_in_accounts() -> List[str]:
+    """Accounts of the pooled loaders which are logged in."""
+    with _POOL_LOCK:
+        loaders = list(_LOADERS.items())
+    return sorted(account for account, loader in loaders if loader.context.is_logged_in)
+
+
+def reset_loader(account: Optional[str] = None):
+    """Drop the loader of the given account (by default the current one) from the pool."""
+    global _LOGIN_USER
+    key = _account_key(account)
+    with _POOL_LOCK:
+        _LOADERS.pop(key, None)
+    if key == _LOGIN_USER:
+        _LOGIN_USER = None
+
+
+def account_lock(account: Optional[str] = None) -> threading.RLock:
+    """Lock serializing the use of an account's loader, so that concurrent jobs stay within the rate budget of its
+    session and do not change its per-job settings under each other's feet. Jobs of different accounts run in
+    parallel."""
+    key = _account_key(account)
+    with _POOL_LOCK:
+        return _ACCOUNT_LOCKS.setdefault(key, threading.RLock())
+
+
+def request_account() -> Optional[str]:
+    """Account named by the current request's "account" parameter, if any."""
+    data = request.get_json(force=True, silent=True) or {}
+    return data.get('account') or request.args.get('account') or None
+
+
+def with_account_lock(account_of: Callable[[], Optional[str]]):
+    """Run a route with exclusive access to the loader of the account returned by account_of."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with account_lock(account_of()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 def download_media(target_username: str,
@@ -55,9 +130,60 @@ def download_media(target_username: str,
                    include_stories: bool,
                    delay: float,
                    backoff: float,
-                   stories_limit: int):
-    L = get_loader()
-    
+                   stories_limit: int,
+                   max_bandwidth: Optional[float] = None,
+                   image_resolution: Optional[str] = None,
+                   fast_update: bool = False,
+                   account: Optional[str] = None):
+    L = get_loader(account)
+    with job_settings(L, max_bandwidth, image_resolution):
+        return _download_media(L, target_username, limit, include_posts, include_reels, include_stories,
+                               delay, backoff, stories_limit, fast_update)
+
+
+@contextmanager
+def job_settings(L: instastorysaver.Instaloader, max_bandwidth: Optional[float], image_resolution: Optional[str]):
+    """Apply per-job bandwidth cap and image resolution to the calling thread's use of the shared loader."""
+    policy = instastorysaver.ImageResolution.from_string(image_resolution) if image_resolution else None
+    with L.context.bandwidth_limit(max_bandwidth), L.context.image_resolution_policy(policy):
+        yield
+
+
+def _download_media(L: instastorysaver.Instaloader,
+                    target_username: str,
+                    limit: int,
+                    include_posts: bool,
+                    include_reels: bool,
+                    include_stories: bool,
+                    delay: float,
+                    backoff: float,
+                    stories_limit: int,
+                    fast_update: bool = False):
+    profile = _load_profile(L, target_username)
+    job = _TargetJob(L, profile, target_username)
+    for _ in _download_steps(job, limit, include_posts, include_reels, include_stories, delay, backoff,
+                             stories_limit, fast_update):
+        pass
+    return job.finish()
+
+
+def _download_steps(job: '_TargetJob',
+                    limit: int,
+                    include_posts: bool,
+                    include_reels: bool,
+                    include_stories: bool,
+                    delay: float,
+                    backoff: float,
+                    stories_limit: int,
+                    fast_update: bool = False) -> Iterator[None]:
+    if include_stories:
+        # Stories expire after 24 hours, so capture them before the posts
+        job.download_stories(None, stories_limit)
+        yield
+    yield from job.download_posts(limit, include_posts, include_reels, delay, backoff, fast_update)
+
+
+def _load_profile(L: instastorysaver.Instaloader, target_username: str) -> instastorysaver.Profile:
     # Try to get profile with better error handling
     try:
         profile = instastorysaver.Profile.from_username(L.context, target_username)
@@ -74,6 +200,7 @@ def download_media(target_username: str,
             raise instastorysaver.exceptions.LoginRequiredException(
                 f"Profile '{target_username}' is private and requires login"
             )
+        return profile
             
     except Exception as e:
         error_msg = str(e).lower()
@@ -101,281 +228,305 @@ def download_media(target_username: str,
             )
         else:
             raise
-    
-    # Create user-based folder structure instead of timestamp-based
-    user_dir = os.path.join(DOWNLOAD_DIR, target_username)
-    posts_dir = os.path.join(user_dir, 'posts')
-    reels_dir = os.path.join(user_dir, 'reels')
-    stories_dir = os.path.join(user_dir, 'stories')
-    
-    # Create directories if they don't exist
-    for d in (user_dir, posts_dir, reels_dir, stories_dir):
-        os.makedirs(d, exist_ok=True)
-    
-    # Set the download pattern to organize files properly
-    L.dirname_pattern = user_dir
-    
-    # Create a session log file to track downloads
-    timestamp = datetime.now(UTC).strftime('%Y%m%d_%H%M%S')
-    session_log = os.path.join(user_dir, f'download_log_{timestamp}.txt')
 
-    stats: Dict[str, int] = {"posts_downloaded": 0, "reels_downloaded": 0, "rate_limit_retries": 0}
-    posts_meta: List[dict] = []
-    count = 0
-    
-    try:
-        L.context.log(f"Starting to fetch posts for {target_username} (limit: {limit})")
-        post_iterator = profile.get_posts()
-        L.context.log("Post iterator created successfully")
-        
-        posts_found = 0
-        iterator_empty = True
+
+class _TargetJob:
+    """Download state of one target: its folders, the collected metadata and the stats.
+
+    The stages are separate, so that the batch endpoint can share story lookups between targets and interleave
+    their posts. If on_event is given, each downloaded, skipped or failed item is passed to it instead of being
+    collected in posts_meta and stories_meta."""
+
+    def __init__(self, L: instastorysaver.Instaloader, profile: instastorysaver.Profile, target_username: str,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.L = L
+        self.profile = profile
+        self.target_username = target_username
+
+        # Create user-based folder structure instead of timestamp-based
+        self.user_dir = os.path.join(DOWNLOAD_DIR, target_username)
+        self.posts_dir = os.path.join(self.user_dir, 'posts')
+        self.reels_dir = os.path.join(self.user_dir, 'reels')
+        self.stories_dir = os.path.join(self.user_dir, 'stories')
         
-        # Add timeout protection for the iterator
-        import time
-        iterator_start = time.time()
-        max_iterator_time = 30  # 30 seconds max for iterator
+        # Create directories if they don't exist
+        for d in (self.user_dir, self.posts_dir, self.reels_dir, self.stories_dir):
+            os.makedirs(d, exist_ok=True)
         
-        for post in post_iterator:
-            iterator_empty = False
-            posts_found += 1
-            L.context.log(f"Processing post {posts_found}: {post.shortcode} (is_video: {post.is_video})")
-            
-            # Check timeout
-            if time.time() - iterator_start > max_iterator_time:
-                L.context.log(f"Iterator timeout after {max_iterator_time} seconds")
-                break
+        # Create a session log file to track downloads
+        self.timestamp = datetime.now(UTC).strftime('%Y%m%d_%H%M%S')
+        self.session_log = os.path.join(self.user_dir, f'download_log_{self.timestamp}.txt')
+
+        self.stories_meta: List[dict] = []
+        self.stories_status = 'not_requested'
+        self.stats: Dict[str, int] = {"posts_downloaded": 0, "reels_downloaded": 0, "rate_limit_retries": 0}
+        self.posts_meta: List[dict] = []
+        self.count = 0
+        self.on_event = on_event
+
+    def _record(self, kind: str, entry: Dict[str, Any]):
+        # When streaming, items are passed on as events rather than collected, so memory use does not grow with
+        # the number of items
+        if self.on_event is None:
+            (self.stories_meta if kind == 'story' else self.posts_meta).append(entry)
+        else:
+            self.on_event({'event': kind, **entry})
+
+    def download_stories(self, stories: Optional[Iterable[instastorysaver.Story]], stories_limit: int):
+        """Download the target's story items, closest to expiry first.
+
+        :param stories: The target's stories if already fetched, None to fetch them here."""
+        L, profile, target_username, stories_dir = self.L, self.profile, self.target_username, self.stories_dir
+        record = partial(self._record, 'story')
+        if not L.context.is_logged_in:
+            self.stories_status = 'login_required'
+            record({'error': 'login_required_for_stories'})
+            return
+        grabbed = 0
+        found = False
+        try:
+            if stories is None:
+                # Check if profile object is valid and has userid
+                if not hasattr(profile, 'userid') or not profile.userid:
+                    raise Exception("Profile userid not available - profile may not be loaded properly")
+                    
+                L.context.log(f"Attempting to fetch stories for user ID: {profile.userid}")
+                stories = L.get_stories(userids=[profile.userid])
             
-            if count >= limit:
-                L.context.log(f"Reached limit of {limit} posts")
-                break
-                
-            is_reel_candidate = bool(post.is_video)
-            if (is_reel_candidate and not include_reels) or ((not is_reel_candidate) and not include_posts):
-                L.context.log(f"Skipping post {post.shortcode} due to type filter")
-                continue
-                
-            attempt = 0
-            while True:
+            # Download the items closest to expiry first
+            scheduler = instastorysaver.CaptureScheduler()
+
+            def _grab(item):
+                nonlocal grabbed
+                if grabbed >= stories_limit:
+                    return
                 try:
-                    sub = 'reels' if is_reel_candidate else 'posts'
-                    L.context.log(f"Downloading {post.shortcode} to {sub}")
+                    L.context.log(f"Downloading story item {grabbed + 1}")
+                    
+                    # Download the story item straight to its final name in the stories directory
+                    downloaded = L.download_storyitem(item, target=target_username, dirname_pattern=stories_dir,
+                                                      filename_pattern=STORY_FILENAME_PATTERN)
+                    
+                    record({'date_utc': item.date_utc.isoformat(), 'is_video': item.is_video})
+                    L.context.log(f"Successfully downloaded story item {grabbed + 1}" if downloaded
+                                  else f"Story item {grabbed + 1} was downloaded before")
                     
-                    # Set target directory for this specific download
-                    if is_reel_candidate:
-                        L.dirname_pattern = reels_dir
-                    else:
-                        L.dirname_pattern = posts_dir
-                        
-                    L.download_post(post, target=target_username)
-                    posts_meta.append({
-                        'shortcode': post.shortcode,
-                        'date_utc': post.date_utc.isoformat(),
-                        'is_video': post.is_video,
-                        'type': 'reel' if is_reel_candidate else 'post'
-                    })
-                    if is_reel_candidate:
-                        stats['reels_downloaded'] += 1
-                    else:
-                        stats['posts_downloaded'] += 1
-                    L.context.log(f"Successfully downloaded {post.shortcode}")
-                    break
-                except instastorysaver.exceptions.ConnectionException as ce:
-                    attempt += 1
-                    stats['rate_limit_retries'] += 1
-                    L.context.log(f"Rate limit hit for {post.shortcode}, attempt {attempt}")
-                    time.sleep(backoff * attempt)
-                    if attempt >= 3:
-                        L.context.log(f"Max retries reached for {post.shortcode}")
-                        posts_meta.append({'error': str(ce), 'shortcode': post.shortcode})
-                        break
                 except Exception as e:
-                    L.context.log(f"Error downloading {post.shortcode}: {e}")
-                    posts_meta.append({'error': str(e), 'shortcode': post.shortcode})
-                    break
-            count += 1
-            if delay > 0:
-                time.sleep(delay)
-                
-        L.context.log(f"Total posts found: {posts_found}, downloaded: {count}")
-        
-        if iterator_empty:
-            L.context.log("Post iterator was completely empty - possible causes:")
-            L.context.log("1. Instagram is blocking post enumeration (common anti-bot measure)")
-            L.context.log("2. Account may require different authentication level")
-            L.context.log("3. Posts may be in a format the API doesn't recognize")
-            L.context.log("4. Rate limiting affecting post listing specifically")
+                    L.context.log(f"Error downloading story item: {e}")
+                    record({'error': str(e)})
+                grabbed += 1
+
+            for story in stories:
+                found = True
+                L.context.log(f"Found story items for {target_username}")
+                for item in story.get_items():
+                    scheduler.add(instastorysaver.CapturePriority.STORY, partial(_grab, item), item.expiring_utc)
+            scheduler.run()
+
+            L.context.log(f"Stories processing complete. Found: {found}, Downloaded: {grabbed}")
+            self.stories_status = 'no_stories' if not found else ('empty' if grabbed == 0 else 'downloaded')
             
-            # Add diagnostic info to the response
-            posts_meta.append({
-                'diagnostic': 'post_iterator_empty',
-                'profile_posts': profile.mediacount,
-                'profile_private': profile.is_private,
-                'login_status': L.context.is_logged_in,
-                'suggestion': 'Instagram may be blocking post enumeration. Try again later or with a different account.',
-                'workaround': 'Consider downloading stories only, or try with a different Instagram account'
-            })
+        except Exception as e:
+            error_msg = str(e).lower()
+            L.context.log(f"Stories error: {e}")
+            self.stories_status = 'error'
             
-        elif posts_found == 0:
-            L.context.log("Iterator returned but no posts found - this could be due to:")
-            L.context.log("1. All posts are filtered out (e.g., only reels when posts requested)")
-            L.context.log("2. Posts require higher authentication level")
-            L.context.log("3. Temporary Instagram API restrictions")
+            # Provide specific error context with full error message
+            full_error = str(e)
+            if "rate limit" in error_msg or "please wait" in error_msg:
+                record({
+                    'error': 'rate_limited',
+                    'details': 'Instagram is rate limiting story requests',
+                    'suggestion': 'Wait 30-60 minutes before trying stories again',
+                    'full_error': full_error
+                })
+            elif "not found" in error_msg or "404" in error_msg:
+                record({
+                    'error': 'no_stories_available',
+                    'details': 'User has no active stories (24h expiry)',
+                    'suggestion': 'Stories may have expired or user has no current stories',
+                    'full_error': full_error
+                })
+            elif "private" in error_msg or "login" in error_msg:
+                record({
+                    'error': 'access_denied',
+                    'details': 'Cannot access stories - may require higher auth level',
+                    'suggestion': 'Try logging in through Instagram web first',
+                    'full_error': full_error
+                })
+            elif "userid not available" in error_msg:
+                record({
+                    'error': 'profile_userid_missing',
+                    'details': 'Profile userid not available due to rate limiting or access restrictions',
+                    'suggestion': 'Instagram may be blocking profile access. Try with different account or wait.',
+                    'full_error': full_error
+                })
+            else:
+                record({
+                    'error': 'unknown_error',
+                    'details': f'Unexpected error during story fetch: {type(e).__name__}',
+                    'suggestion': 'Try again later or check account permissions',
+                    'full_error': full_error
+                })
+
+    def download_posts(self, limit: int, include_posts: bool, include_reels: bool, delay: float, backoff: float,
+                       fast_update: bool = False) -> Iterator[None]:
+        """Download the target's posts and reels, yielding after each one so that callers can interleave targets."""
+        L, profile, target_username = self.L, self.profile, self.target_username
+        stats, record = self.stats, partial(self._record, 'post')
+        try:
+            L.context.log(f"Starting to fetch posts for {target_username} (limit: {limit})")
+            post_iterator = profile.get_posts()
+            L.context.log("Post iterator created successfully")
             
-            posts_meta.append({
-                'diagnostic': 'no_posts_in_iterator',
-                'profile_posts': profile.mediacount,
-                'filters': f'include_posts:{include_posts}, include_reels:{include_reels}',
-                'suggestion': 'Try enabling both posts and reels, or check if account has recent content'
-            })
+            posts_found = 0
+            iterator_empty = True
             
-    except Exception as e:
-        L.context.log(f"Error during post iteration: {e}")
-        posts_meta.append({'error': f'Post iteration failed: {str(e)}'})
-        # Don't raise here, continue to stories if needed
-
-    stories_meta: List[dict] = []
-    stories_status = 'not_requested'
-    if include_stories:
-        if not L.context.is_logged_in:
-            stories_status = 'login_required'
-            stories_meta.append({'error': 'login_required_for_stories'})
-        else:
-            grabbed = 0
-            found = False
-            try:
-                # Check if profile object is valid and has userid
-                if not hasattr(profile, 'userid') or not profile.userid:
-                    raise Exception("Profile userid not available - profile may not be loaded properly")
-                    
-                L.context.log(f"Attempting to fetch stories for user ID: {profile.userid}")
-                story_iterator = L.get_stories(userids=[profile.userid])
+            # Add timeout protection for the iterator; only time spent on this target counts
+            busy = 0.0
+            resumed = time.time()
+            max_iterator_time = 30  # 30 seconds max for iterator
+            
+            for post in post_iterator:
+                iterator_empty = False
+                posts_found += 1
+                L.context.log(f"Processing post {posts_found}: {post.shortcode} (is_video: {post.is_video})")
+                
+                # Check timeout
+                if busy + time.time() - resumed > max_iterator_time:
+                    L.context.log(f"Iterator timeout after {max_iterator_time} seconds")
+                    break
                 
-                for story in story_iterator:
-                    found = True
-                    L.context.log(f"Found story items for {target_username}")
-                    for item in story.get_items():
-                        if grabbed >= stories_limit:
+                if self.count >= limit:
+                    L.context.log(f"Reached limit of {limit} posts")
+                    break
+                    
+                is_reel_candidate = bool(post.is_video)
+                if (is_reel_candidate and not include_reels) or ((not is_reel_candidate) and not include_posts):
+                    L.context.log(f"Skipping post {post.shortcode} due to type filter")
+                    if self.on_event is not None:
+                        self.on_event({'event': 'post', 'shortcode': post.shortcode, 'skipped': 'type_filter'})
+                        yield
+                    continue
+                    
+                attempt = 0
+                up_to_date = False
+                while True:
+                    try:
+                        sub = 'reels' if is_reel_candidate else 'posts'
+                        L.context.log(f"Downloading {post.shortcode} to {sub}")
+                        
+                        # Pass the target directory for this specific download
+                        up_to_date = not L.download_post(post, target=target_username,
+                                                         dirname_pattern=self.reels_dir if is_reel_candidate
+                                                         else self.posts_dir)
+                        record({
+                            'shortcode': post.shortcode,
+                            'date_utc': post.date_utc.isoformat(),
+                            'is_video': post.is_video,
+                            'type': 'reel' if is_reel_candidate else 'post'
+                        })
+                        if is_reel_candidate:
+                            stats['reels_downloaded'] += 1
+                        else:
+                            stats['posts_downloaded'] += 1
+                        L.context.log(f"Successfully downloaded {post.shortcode}")
+                        break
+                    except instastorysaver.exceptions.ConnectionException as ce:
+                        attempt += 1
+                        stats['rate_limit_retries'] += 1
+                        L.context.log(f"Rate limit hit for {post.shortcode}, attempt {attempt}")
+                        time.sleep(backoff * attempt)
+                        if attempt >= 3:
+                            L.context.log(f"Max retries reached for {post.shortcode}")
+                            record({'error': str(ce), 'shortcode': post.shortcode})
                             break
-                        try:
-                            L.context.log(f"Downloading story item {grabbed + 1}")
-                            
-                            # Use the main loader but set target to stories directory
-                            # Save the original target and restore it after
-                            original_dirname_pattern = L.dirname_pattern
-                            L.dirname_pattern = stories_dir
-                            
-                            # Download the story item
-                            L.download_storyitem(item, target=target_username)
-                            
-                            # Restore original pattern
-                            L.dirname_pattern = original_dirname_pattern
-                            
-                            # Check if files were downloaded
-                            story_files = [f for f in os.listdir(stories_dir) if f.lower().endswith(('.jpg', '.mp4', '.png'))]
-                            L.context.log(f"Story files found in stories directory: {story_files}")
-                            
-                            stories_meta.append({'date_utc': item.date_utc.isoformat(), 'is_video': item.is_video})
-                            L.context.log(f"Successfully downloaded story item {grabbed + 1}")
-                            
-                        except Exception as e:
-                            # Restore dirname_pattern even on error
-                            try:
-                                L.dirname_pattern = original_dirname_pattern
-                            except:
-                                pass
-                            L.context.log(f"Error downloading story item: {e}")
-                            stories_meta.append({'error': str(e)})
-                        grabbed += 1
-                    if grabbed >= stories_limit:
+                    except Exception as e:
+                        L.context.log(f"Error downloading {post.shortcode}: {e}")
+                        record({'error': str(e), 'shortcode': post.shortcode})
                         break
-                        
-                L.context.log(f"Stories processing complete. Found: {found}, Downloaded: {grabbed}")
-                stories_status = 'no_stories' if not found else ('empty' if grabbed == 0 else 'downloaded')
+                self.count += 1
+                if fast_update and up_to_date and not post.is_pinned:
+                    L.context.log(f"{post.shortcode} was downloaded before, no newer posts")
+                    break
+                if delay > 0:
+                    time.sleep(delay)
+                busy += time.time() - resumed
+                yield
+                resumed = time.time()
+                    
+            L.context.log(f"Total posts found: {posts_found}, downloaded: {self.count}")
+            
+            if iterator_empty:
+                L.context.log("Post iterator was completely empty - possible causes:")
+                L.context.log("1. Instagram is blocking post enumeration (common anti-bot measure)")
+                L.context.log("2. Account may require different authentication level")
+                L.context.log("3. Posts may be in a format the API doesn't recognize")
+                L.context.log("4. Rate limiting affecting post listing specifically")
                 
-            except Exception as e:
-                error_msg = str(e).lower()
-                L.context.log(f"Stories error: {e}")
-                stories_status = 'error'
+                # Add diagnostic info to the response
+                record({
+                    'diagnostic': 'post_iterator_empty',
+                    'profile_posts': profile.mediacount,
+                    'profile_private': profile.is_private,
+                    'login_status': L.context.is_logged_in,
+                    'suggestion': 'Instagram may be blocking post enumeration. Try again later or with a different account.',
+                    'workaround': 'Consider downloading stories only, or try with a different Instagram account'
+                })
                 
-                # Provide specific error context with full error message
-                full_error = str(e)
-                if "rate limit" in error_msg or "please wait" in error_msg:
-                    stories_meta.append({
-                        'error': 'rate_limited',
-                        'details': 'Instagram is rate limiting story requests',
-                        'suggestion': 'Wait 30-60 minutes before trying stories again',
-                        'full_error': full_error
-                    })
-                elif "not found" in error_msg or "404" in error_msg:
-                    stories_meta.append({
-                        'error': 'no_stories_available',
-                        'details': 'User has no active stories (24h expiry)',
-                        'suggestion': 'Stories may have expired or user has no current stories',
-                        'full_error': full_error
-                    })
-                elif "private" in error_msg or "login" in error_msg:
-                    stories_meta.append({
-                        'error': 'access_denied',
-                        'details': 'Cannot access stories - may require higher auth level',
-                        'suggestion': 'Try logging in through Instagram web first',
-                        'full_error': full_error
-                    })
-                elif "userid not available" in error_msg:
-                    stories_meta.append({
-                        'error': 'profile_userid_missing',
-                        'details': 'Profile userid not available due to rate limiting or access restrictions',
-                        'suggestion': 'Instagram may be blocking profile access. Try with different account or wait.',
-                        'full_error': full_error
-                    })
-                else:
-                    stories_meta.append({
-                        'error': 'unknown_error',
-                        'details': f'Unexpected error during story fetch: {type(e).__name__}',
-                        'suggestion': 'Try again later or check account permissions',
-                        'full_error': full_error
-                    })
-
-    # Clean up empty directories
-    for f in (posts_dir, reels_dir, stories_dir):
-        _cleanup(f)
-    
-    # Rename story files with proper prefix
-    with suppress(Exception):
-        for f in os.listdir(stories_dir):
-            if f.lower().endswith(('.jpg', '.mp4')) and not f.startswith('story_'):
-                os.replace(os.path.join(stories_dir, f), os.path.join(stories_dir, 'story_' + f))
+            elif posts_found == 0:
+                L.context.log("Iterator returned but no posts found - this could be due to:")
+                L.context.log("1. All posts are filtered out (e.g., only reels when posts requested)")
+                L.context.log("2. Posts require higher authentication level")
+                L.context.log("3. Temporary Instagram API restrictions")
+                
+                record({
+                    'diagnostic': 'no_posts_in_iterator',
+                    'profile_posts': profile.mediacount,
+                    'filters': f'include_posts:{include_posts}, include_reels:{include_reels}',
+                    'suggestion': 'Try enabling both posts and reels, or check if account has recent content'
+                })
+                
+        except Exception as e:
+            L.context.log(f"Error during post iteration: {e}")
+            record({'error': f'Post iteration failed: {str(e)}'})
 
-    # Create session log entry
-    try:
-        with open(session_log, 'w', encoding='utf-8') as log_file:
-            log_file.write(f"Download Session: {timestamp}\n")
-            log_file.write(f"Target: {target_username}\n")
-            log_file.write(f"Posts Downloaded: {stats['posts_downloaded']}\n")
-            log_file.write(f"Reels Downloaded: {stats['reels_downloaded']}\n")
-            log_file.write(f"Stories Status: {stories_status}\n")
-            log_file.write(f"Rate Retries: {stats['rate_limit_retries']}\n")
-    except Exception as e:
-        L.context.log(f"Could not write session log: {e}")
+    def finish(self) -> Dict[str, Any]:
+        """Write the target's session log and return the result."""
+        L, stats = self.L, self.stats
+        posts_dir, reels_dir, stories_dir = self.posts_dir, self.reels_dir, self.stories_dir
 
-    return {
-        'folders': {'base': user_dir, 'posts': posts_dir, 'reels': reels_dir, 'stories': stories_dir},
-        'posts_meta': posts_meta,
-        'stories_meta': stories_meta,
-        'stories_status': stories_status,
-        'stats': stats,
-        'count': count,
-        'session_log': session_log,
-        'profile_info': {
-            'username': target_username,
-            'mediacount': profile.mediacount if 'profile' in locals() else 'unknown',
-            'is_private': profile.is_private if 'profile' in locals() else 'unknown',
-            'logged_in': L.context.is_logged_in
+        # Create session log entry
+        try:
+            with open(self.session_log, 'w', encoding='utf-8') as log_file:
+                log_file.write(f"Download Session: {self.timestamp}\n")
+                log_file.write(f"Target: {self.target_username}\n")
+                log_file.write(f"Posts Downloaded: {stats['posts_downloaded']}\n")
+                log_file.write(f"Reels Downloaded: {stats['reels_downloaded']}\n")
+                log_file.write(f"Stories Status: {self.stories_status}\n")
+                log_file.write(f"Rate Retries: {stats['rate_limit_retries']}\n")
+        except Exception as e:
+            L.context.log(f"Could not write session log: {e}")
+
+        return {
+            'folders': {'base': self.user_dir, 'posts': posts_dir, 'reels': reels_dir, 'stories': stories_dir},
+            'posts_meta': self.posts_meta,
+            'stories_meta': self.stories_meta,
+            'stories_status': self.stories_status,
+            'stats': stats,
+            'count': self.count,
+            'session_log': self.session_log,
+            'profile_info': {
+                'username': self.target_username,
+                'mediacount': self.profile.mediacount,
+                'is_private': self.profile.is_private,
+                'logged_in': L.context.is_logged_in
+            }
         }
-    }
 
 
 @app.route('/login', methods=['POST'])
+@with_account_lock(lambda: (request.get_json(force=True, silent=True) or {}).get('username') or '')
 def login():
     global _LOGIN_USER
     data = request.get_json(force=True, silent=True) or {}
@@ -386,13 +537,14 @@ def login():
     if not use_browser_cookies and (not ig_user or not ig_pass):
         return jsonify({"error": "username and password required (or set use_browser_cookies)"}), 400
     
-    # Check if we're trying to login with a different user
-    if _LOGIN_USER and not use_browser_cookies and ig_user != _LOGIN_USER:
-        reset_loader()  # Reset to allow different account login
-    elif _LOGIN_USER and use_browser_cookies:
-        reset_loader()  # Reset for browser cookies login
-    
-    L = get_loader()
+    if use_browser_cookies:
+        # The account is only known after loading the cookies, so the loader joins the pool afterwards
+        L = new_loader()
+    else:
+        L = get_loader(ig_user)
+        if L.context.is_logged_in and L.context.username == ig_user:
+            _LOGIN_USER = ig_user
+            return jsonify({"message": f"Logged in as {ig_user} (pooled session)", "logged_in": True})
     try:
         if use_browser_cookies:
             L.context.log("Attempting to load browser cookies...")
@@ -410,7 +562,6 @@ def login():
                     L.context.log(f"Trying {browser} cookies...")
                     L.context.load_cookies_from_browser(browser)
                     if L.context.is_logged_in:
-                        _LOGIN_USER = L.context.username or "browser_user"
                         # Save with safe filename
                         try:
                             L.save_session_to_file()
@@ -429,6 +580,8 @@ def login():
                     "browser_cookies_failed": True
                 }), 401
             
+            _LOGIN_USER = L.context.username or "browser_user"
+            add_loader(_LOGIN_USER, L)
             return jsonify({
                 "message": f"Logged in using browser cookies as {_LOGIN_USER}", 
                 "logged_in": True,
@@ -521,11 +674,11 @@ def login():
 
 
 @app.route('/logout', methods=['POST'])
+@with_account_lock(request_account)
 def logout():
-    """Logout current user and reset session."""
-    global _LOGIN_USER
-    current_user = _LOGIN_USER
-    reset_loader()
+    """Logout an account (by default the current one) and drop its session from the pool."""
+    current_user = request_account() or _LOGIN_USER
+    reset_loader(current_user)
     return jsonify({
         "message": f"Logged out {current_user or 'current user'}", 
         "logged_out": True,
@@ -536,11 +689,17 @@ def logout():
 @app.route('/status')
 def status():
     """Get current login status."""
-    global L, _LOGIN_USER
-    
     try:
-        L = get_loader()
-        if not L.context.is_logged_in:
+        account = request.args.get('account')
+        # Looked up without creating a loader, so that unknown names do not grow the pool
+        L = find_loader(account)
+        if L is None and account is not None:
+            return jsonify({
+                "logged_in": False,
+                "logged_in_as": None,
+                "status": "unknown_account"
+            }), 404
+        if L is None or not L.context.is_logged_in:
             return jsonify({
                 "logged_in": False,
                 "logged_in_as": None,
@@ -561,7 +720,7 @@ def status():
             if "Please wait a few minutes" in error_str or "401 Unauthorized" in error_str:
                 return jsonify({
                     "logged_in": True,
-                    "logged_in_as": _LOGIN_USER or "Unknown",
+                    "logged_in_as": L.context.username or "Unknown",
                     "status": "rate_limited",
                     "warning": "Rate limited - session may still work for downloads"
                 })
@@ -582,6 +741,7 @@ def status():
 
 
 @app.route('/download', methods=['GET', 'POST'])
+@with_account_lock(request_account)
 def download():  # type: ignore
     # Handle both GET and POST requests
     if request.method == 'POST':
@@ -594,6 +754,11 @@ def download():  # type: ignore
         include_posts = data.get('include_posts', True)
         include_reels = data.get('include_reels', True)
         include_stories = data.get('include_stories', False)
+        try:
+            max_bandwidth = float(data['max_bandwidth']) if data.get('max_bandwidth') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_bandwidth must be a number'}), 400
+        image_resolution = data.get('image_resolution')
     else:
         # GET request (legacy support)
         target = request.args.get('username')
@@ -602,81 +767,405 @@ def download():  # type: ignore
             delay = float(request.args.get('delay', '0') or 0)
             backoff = float(request.args.get('backoff', '15') or 15)
             stories_limit = int(request.args.get('stories_limit', '50') or 50)
+            max_bandwidth = float(request.args.get('max_bandwidth', '0') or 0) or None
         except ValueError:
             return jsonify({'error': 'numeric parameters invalid'}), 400
         include_posts = request.args.get('include_posts', '1') in ('1', 'true', 'yes')
         include_reels = request.args.get('include_reels', '1') in ('1', 'true', 'yes')
         include_stories = request.args.get('stories', '0') in ('1', 'true', 'yes')
+        image_resolution = request.args.get('image_resolution')
     
     if not target:
         return jsonify({'error': 'username parameter required'}), 400
+    stream = request.args.get('stream', '0') in ('1', 'true', 'yes')
+    if request.method == 'POST':
+        stream = stream or bool(data.get('stream'))
+    if stream:
+        events = _download_events(target, limit, include_posts, include_reels, include_stories, delay, backoff,
+                                  stories_limit, max_bandwidth, image_resolution, request_account())
+        return Response(stream_with_context(events), mimetype='application/x-ndjson')
     try:
-        result = download_media(target, limit, include_posts, include_reels, include_stories, delay, backoff, stories_limit)
-        
-        # Enhanced response message
-        profile_info = result.get('profile_info', {})
-        profile_mediacount = profile_info.get('mediacount', 'unknown')
-        profile_private = profile_info.get('is_private', 'unknown')
-        
-        message_parts = [f'Downloaded {result["count"]} posts/reels for {target}']
-        if include_stories:
-            message_parts.append('+ stories')
-        message_parts.append(f'Posts:{result["stats"]["posts_downloaded"]} Reels:{result["stats"]["reels_downloaded"]} RateRetries:{result["stats"]["rate_limit_retries"]} Stories: {result["stories_status"]}')
+        result = download_media(target, limit, include_posts, include_reels, include_stories, delay, backoff,
+                                stories_limit, max_bandwidth, image_resolution, account=request_account())
         
-        if profile_mediacount != 'unknown':
-            message_parts.append(f'Profile has {profile_mediacount} posts total')
-        if profile_private != 'unknown':
-            message_parts.append(f'Private: {profile_private}')
-        
-        # Add folder location info
-        base_folder = result['folders']['base']
-        message_parts.append(f'Saved to: {base_folder}')
-            
-        return jsonify({
-            'message': ' | '.join(message_parts),
-            'folders': result['folders'],
-            'posts': result['posts_meta'],
-            'stories': result['stories_meta'],
-            'stories_status': result['stories_status'],
-            'stats': result['stats'],
-            'profile_info': result['profile_info'],
-            'session_log': result.get('session_log'),
-            'selection': {
-                'include_posts': include_posts,
-                'include_reels': include_reels,
-                'include_stories': include_stories
-            },
-            'logged_in_as': _LOGIN_USER
-        })
-    except instastorysaver.exceptions.QueryReturnedNotFoundException:
-        return jsonify({'error': 'Profile not found'}), 404
-    except instastorysaver.exceptions.LoginRequiredException:
-        return jsonify({'error': 'Login required to access this profile.'}), 401
-    except instastorysaver.exceptions.ConnectionException as e:
-        error_msg = str(e).lower()
+        return jsonify(result_response(target, result, include_posts, include_reels, include_stories))
+    except Exception as e:
+        payload, code = error_response(e)
+        return jsonify(payload), code
+
+
+def _download_events(target_username: str,
+                     limit: int,
+                     include_posts: bool,
+                     include_reels: bool,
+                     include_stories: bool,
+                     delay: float,
+                     backoff: float,
+                     stories_limit: int,
+                     max_bandwidth: Optional[float] = None,
+                     image_resolution: Optional[str] = None,
+                     account: Optional[str] = None) -> Iterator[str]:
+    """Download a target like download_media, as NDJSON lines: one event per downloaded, skipped or failed item,
+    followed by a summary event (or an error event)."""
+    events: deque = deque()
+
+    def drain() -> Iterator[str]:
+        while events:
+            yield json.dumps(events.popleft()) + '\n'
+
+    # The lock is taken here rather than by the route's decorator, as the route returns before the stream is consumed
+    with account_lock(account):
+        try:
+            L = get_loader(account)
+            with job_settings(L, max_bandwidth, image_resolution):
+                profile = _load_profile(L, target_username)
+                job = _TargetJob(L, profile, target_username, on_event=events.append)
+                yield json.dumps({'event': 'profile', 'username': target_username, 'mediacount': profile.mediacount,
+                                  'is_private': profile.is_private}) + '\n'
+                for _ in _download_steps(job, limit, include_posts, include_reels, include_stories, delay, backoff,
+                                         stories_limit):
+                    yield from drain()
+                yield from drain()
+                summary = result_response(target_username, job.finish(), include_posts, include_reels,
+                                          include_stories)
+                # The items have been streamed already
+                del summary['posts'], summary['stories']
+                yield json.dumps({'event': 'summary', **summary}) + '\n'
+        except Exception as e:
+            yield from drain()
+            payload, code = error_response(e)
+            yield json.dumps({'event': 'error', 'status': code, **payload}) + '\n'
+
+
+def error_response(e: Exception):
+    """JSON payload and HTTP status describing why downloading a target failed."""
+    if isinstance(e, instastorysaver.exceptions.InvalidArgumentException):
+        return {'error': str(e)}, 400
+    if isinstance(e, instastorysaver.exceptions.QueryReturnedNotFoundException):
+        return {'error': 'Profile not found'}, 404
+    if isinstance(e, instastorysaver.exceptions.LoginRequiredException):
+        return {'error': 'Login required to access this profile.'}, 401
+    error_msg = str(e).lower()
+    if isinstance(e, instastorysaver.exceptions.ConnectionException):
         if "please wait a few minutes" in error_msg or "heavily rate limiting" in error_msg:
-            return jsonify({
+            return {
                 'error': 'Instagram is heavily rate limiting your account. This is why no posts are being detected.',
                 'rate_limited': True,
                 'suggestion': 'Please wait 30-60 minutes before trying again. Consider using the extension less frequently.',
                 'details': str(e)
-            }), 429
+            }, 429
         elif "challenge_required" in error_msg:
-            return jsonify({
+            return {
                 'error': 'Instagram challenge required. Please log in through Instagram web/app first and complete any verification.',
                 'challenge_required': True,
                 'suggestion': 'Try logging in through Instagram.com, complete any challenges, then retry.'
-            }), 429
+            }, 429
         else:
-            return jsonify({'error': f'Connection error: {str(e)}'}), 503
-    except Exception as e:
-        error_msg = str(e).lower()
-        if "challenge_required" in error_msg:
-            return jsonify({
-                'error': 'Instagram challenge required. Please log in through Instagram web/app first and complete any verification.',
-                'challenge_required': True
-            }), 429
-        return jsonify({'error': str(e)}), 500
+            return {'error': f'Connection error: {str(e)}'}, 503
+    if "challenge_required" in error_msg:
+        return {
+            'error': 'Instagram challenge required. Please log in through Instagram web/app first and complete any verification.',
+            'challenge_required': True
+        }, 429
+    return {'error': str(e)}, 500
+
+
+def result_response(target: str, result: Dict[str, Any], include_posts: bool, include_reels: bool,
+                    include_stories: bool) -> Dict[str, Any]:
+    """JSON payload describing the result of downloading a target."""
+    # Enhanced response message
+    profile_info = result.get('profile_info', {})
+    profile_mediacount = profile_info.get('mediacount', 'unknown')
+    profile_private = profile_info.get('is_private', 'unknown')
+    
+    message_parts = [f'Downloaded {result["count"]} posts/reels for {target}']
+    if include_stories:
+        message_parts.append('+ stories')
+    message_parts.append(f'Posts:{result["stats"]["posts_downloaded"]} Reels:{result["stats"]["reels_downloaded"]} RateRetries:{result["stats"]["rate_limit_retries"]} Stories: {result["stories_status"]}')
+    
+    if profile_mediacount != 'unknown':
+        message_parts.append(f'Profile has {profile_mediacount} posts total')
+    if profile_private != 'unknown':
+        message_parts.append(f'Private: {profile_private}')
+    
+    # Add folder location info
+    base_folder = result['folders']['base']
+    message_parts.append(f'Saved to: {base_folder}')
+        
+    return {
+        'message': ' | '.join(message_parts),
+        'folders': result['folders'],
+        'posts': result['posts_meta'],
+        'stories': result['stories_meta'],
+        'stories_status': result['stories_status'],
+        'stats': result['stats'],
+        'profile_info': result['profile_info'],
+        'session_log': result.get('session_log'),
+        'selection': {
+            'include_posts': include_posts,
+            'include_reels': include_reels,
+            'include_stories': include_stories
+        },
+        'logged_in_as': _LOGIN_USER
+    }
+
+
+# Profiles of a batch are resolved concurrently; the rate controller reserves each query's slot atomically
+MAX_BATCH_CONCURRENCY = 8
+
+
+@app.route('/download/batch', methods=['POST'])
+def download_batch():
+    """Download many targets in one job, streaming one JSON line per target as it completes.
+
+    POST body: {"targets": [username or {"target_username": ..., per-target options}, ...], "concurrency": int,
+    "account": ..., "max_bandwidth": ..., "image_resolution": ..., and defaults for the per-target options limit,
+    delay, backoff, stories_limit, include_posts, include_reels, include_stories}"""
+    data = request.get_json(force=True, silent=True) or {}
+    targets = data.get('targets')
+    if not isinstance(targets, list) or not targets:
+        return jsonify({'error': 'targets list required'}), 400
+    defaults = {'limit': data.get('limit', 5), 'delay': data.get('delay', 0), 'backoff': data.get('backoff', 15),
+                'stories_limit': data.get('stories_limit', 50), 'include_posts': data.get('include_posts', True),
+                'include_reels': data.get('include_reels', True),
+                'include_stories': data.get('include_stories', False)}
+    options = []
+    try:
+        for target in targets:
+            opts = {**defaults, **(target if isinstance(target, dict) else {'target_username': target})}
+            if not opts.get('target_username'):
+                return jsonify({'error': 'target_username required for each target'}), 400
+            opts.update(limit=int(opts['limit']), delay=float(opts['delay']), backoff=float(opts['backoff']),
+                        stories_limit=int(opts['stories_limit']))
+            options.append(opts)
+        concurrency = max(1, min(MAX_BATCH_CONCURRENCY, int(data.get('concurrency', 3))))
+        max_bandwidth = float(data['max_bandwidth']) if data.get('max_bandwidth') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'numeric parameters invalid'}), 400
+    if data.get('image_resolution'):
+        try:
+            instastorysaver.ImageResolution.from_string(data['image_resolution'])
+        except instastorysaver.exceptions.InvalidArgumentException as e:
+            return jsonify({'error': str(e)}), 400
+    events = _batch_events(options, concurrency, max_bandwidth, data.get('image_resolution'), data.get('account'))
+    return Response(stream_with_context(events), mimetype='application/x-ndjson')
+
+
+def _batch_events(options: List[Dict[str, Any]], concurrency: int, max_bandwidth: Optional[float],
+                  image_resolution: Optional[str], account: Optional[str] = None) -> Iterator[str]:
+    def line(target: str, **payload) -> str:
+        return json.dumps({'target': target, **payload}) + '\n'
+
+    # The lock is taken here rather than by a decorator, as the route returns before the stream is consumed
+    with account_lock(account):
+        L = get_loader(account)
+        with job_settings(L, max_bandwidth, image_resolution):
+            # Resolve the profiles on a pool bounded by MAX_BATCH_CONCURRENCY, to not hit the rate limits in bursts
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [pool.submit(_load_profile, L, opts['target_username']) for opts in options]
+            jobs = []
+            for opts, future in zip(options, futures):
+                try:
+                    jobs.append((_TargetJob(L, future.result(), opts['target_username']), opts))
+                except Exception as e:
+                    payload, code = error_response(e)
+                    yield line(opts['target_username'], status=code, **payload)
+
+            # Fetch the stories of all targets together, which get_stories does in chunks of 50 users
+            story_jobs = [(job, opts) for job, opts in jobs if opts['include_stories']]
+            stories: Optional[Dict[int, instastorysaver.Story]] = None
+            if story_jobs and L.context.is_logged_in:
+                try:
+                    stories = {story.owner_id: story
+                               for story in L.get_stories(userids=[job.profile.userid for job, _ in story_jobs])}
+                except Exception as e:
+                    # Fall back to fetching per target, which reports the error per target
+                    L.context.log(f"Batched stories lookup failed: {e}")
+            for job, opts in story_jobs:
+                own_stories = None
+                if stories is not None:
+                    own_stories = [stories[job.profile.userid]] if job.profile.userid in stories else []
+                job.download_stories(own_stories, opts['stories_limit'])
+
+            # Interleave the targets' posts round-robin, reporting each target once it is done
+            active = deque((job, opts, job.download_posts(opts['limit'], opts['include_posts'], opts['include_reels'],
+                                                          opts['delay'], opts['backoff']))
+                           for job, opts in jobs)
+            while active:
+                job, opts, posts = active.popleft()
+                try:
+                    next(posts)
+                    active.append((job, opts, posts))
+                except StopIteration:
+                    yield line(job.target_username, status=200,
+                               **result_response(job.target_username, job.finish(), opts['include_posts'],
+                                                 opts['include_reels'], opts['include_stories']))
+
+
+@app.route('/bandwidth', methods=['GET', 'POST'])
+def bandwidth():
+    """Get or change the global media download rate limit (bytes per second, null for unlimited).
+
+    POST body: {"max_bandwidth": ..., "burst": ...}; fields that are left out keep their current value."""
+    if request.method == 'POST':
+        data = request.get_json(force=True, silent=True) or {}
+        if 'max_bandwidth' not in data and 'burst' not in data:
+            return jsonify({'error': 'max_bandwidth or burst required'}), 400
+        rate = _BANDWIDTH.rate
+        # Without a limit the burst is meaningless, so a new limit gets the default burst unless given
+        burst = _BANDWIDTH.burst if rate is not None else None
+        try:
+            if 'max_bandwidth' in data:
+                rate = float(data['max_bandwidth']) if data['max_bandwidth'] else None
+            if 'burst' in data:
+                burst = float(data['burst']) if data['burst'] else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_bandwidth and burst must be numbers'}), 400
+        _BANDWIDTH.set_rate(rate, burst)
+    return jsonify({
+        'max_bandwidth': _BANDWIDTH.rate,
+        'burst': _BANDWIDTH.burst if _BANDWIDTH.rate is not None else None
+    })
+
+
+def load_watchlist() -> Dict[str, Dict[str, Any]]:
+    """Watch list entries by target username, as stored in WATCHLIST_FILE."""
+    try:
+        with open(WATCHLIST_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_watchlist(watchlist: Dict[str, Dict[str, Any]]):
+    with open(WATCHLIST_FILE + '.temp', 'w', encoding='utf-8') as f:
+        json.dump(watchlist, f, indent=2)
+    os.replace(WATCHLIST_FILE + '.temp', WATCHLIST_FILE)
+
+
+def _next_poll(interval: float, now: float) -> float:
+    # +-10% jitter, so that entries with equal intervals drift apart instead of polling in bursts
+    return now + interval * random.uniform(0.9, 1.1)
+
+
+def _run_watch_entry(username: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    account = entry.get('account')
+    with account_lock(account):
+        try:
+            result = download_media(username, entry.get('limit', 12), entry.get('include_posts', True),
+                                    entry.get('include_reels', True), entry.get('include_stories', True),
+                                    0, 15, entry.get('stories_limit', 100), fast_update=True, account=account)
+            return {'status': 'ok', 'stats': result['stats'], 'stories_status': result['stories_status']}
+        except Exception as e:
+            app.logger.error(f"Watch list sync of {username} failed: {e}")
+            return {'status': 'error', 'error': str(e)}
+
+
+def _poll_watchlist() -> float:
+    """Sync the due watch list entries, and return when the next one is due."""
+    now = time.time()
+    with _WATCHLIST_LOCK:
+        watchlist = load_watchlist()
+    due = sorted((entry.get('next_run', 0), username) for username, entry in watchlist.items()
+                 if entry.get('next_run', 0) <= now)
+    for _, username in due:
+        with _WATCHLIST_LOCK:
+            entry = load_watchlist().get(username)
+        if entry is None:
+            continue
+        outcome = _run_watch_entry(username, entry)
+        with _WATCHLIST_LOCK:
+            watchlist = load_watchlist()
+            if username in watchlist:
+                finished = time.time()
+                watchlist[username].update(last_run=finished, last_result=outcome,
+                                           next_run=_next_poll(watchlist[username].get('interval', 3600),
+                                                               finished))
+                save_watchlist(watchlist)
+    with _WATCHLIST_LOCK:
+        upcoming = [entry.get('next_run', 0) for entry in load_watchlist().values()]
+    return min(upcoming, default=now + 3600)
+
+
+def _watch_loop():
+    """Poll due watch list entries forever, sleeping until the next one is due or the list changes."""
+    while True:
+        try:
+            next_run = _poll_watchlist()
+        except Exception as e:
+            # Keep the scheduler alive, e.g. if the watch list file is unreadable; retry after a while
+            app.logger.error(f"Watch list scheduler error: {e}")
+            next_run = time.time() + MIN_WATCH_INTERVAL
+        _WATCHLIST_CHANGED.wait(timeout=max(1.0, next_run - time.time()))
+        _WATCHLIST_CHANGED.clear()
+
+
+def start_watcher():
+    """Start the watch list scheduler thread, if not running yet."""
+    global _WATCHER
+    with _WATCHLIST_LOCK:
+        if _WATCHER is None or not _WATCHER.is_alive():
+            _WATCHER = threading.Thread(target=_watch_loop, name='watchlist', daemon=True)
+            _WATCHER.start()
+
+
+@app.before_request
+def _start_watcher_on_first_request():
+    # Also started when the app is served by a WSGI server rather than run as a script, but not merely on import
+    if _WATCHER is None:
+        start_watcher()
+
+
+@app.route('/watchlist', methods=['GET', 'POST'])
+def watchlist_route():  # type: ignore
+    """List the watched targets, or add/update one.
+
+    POST body: {"username": ..., "interval": seconds, "include_posts": bool, "include_reels": bool,
+    "include_stories": bool, "limit": int, "stories_limit": int, "account": account to sync with}"""
+    if request.method == 'GET':
+        with _WATCHLIST_LOCK:
+            return jsonify(load_watchlist())
+    data = request.get_json(force=True, silent=True) or {}
+    username = (data.get('username') or '').strip().lower()
+    if not username:
+        return jsonify({'error': 'username required'}), 400
+    try:
+        interval = max(MIN_WATCH_INTERVAL, float(data.get('interval', 3600)))
+        limit = int(data.get('limit', 12))
+        stories_limit = int(data.get('stories_limit', 100))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'numeric parameters invalid'}), 400
+    with _WATCHLIST_LOCK:
+        watchlist = load_watchlist()
+        entry = watchlist.get(username, {})
+        entry.update({
+            'interval': interval,
+            'include_posts': bool(data.get('include_posts', entry.get('include_posts', True))),
+            'include_reels': bool(data.get('include_reels', entry.get('include_reels', True))),
+            'include_stories': bool(data.get('include_stories', entry.get('include_stories', True))),
+            'limit': limit,
+            'stories_limit': stories_limit,
+            'account': data.get('account', entry.get('account')),
+        })
+        # New entries start at a random point within their interval to spread out the polls
+        entry.setdefault('next_run', time.time() + random.uniform(0, interval))
+        watchlist[username] = entry
+        save_watchlist(watchlist)
+    _WATCHLIST_CHANGED.set()
+    start_watcher()
+    return jsonify({username: entry})
+
+
+@app.route('/watchlist/<username>', methods=['DELETE'])
+def unwatch(username: str):
+    with _WATCHLIST_LOCK:
+        watchlist = load_watchlist()
+        removed = watchlist.pop(username.lower(), None)
+        save_watchlist(watchlist)
+    _WATCHLIST_CHANGED.set()
+    if removed is None:
+        return jsonify({'error': 'not watched'}), 404
+    return jsonify({'removed': username.lower()})
 
 
 @app.route('/')
@@ -685,8 +1174,10 @@ def root():  # type: ignore
         "status": "ok",
         "info": "IG Story Downloader backend running",
         "logged_in_as": _LOGIN_USER,
+        "accounts": logged_in_accounts(),
     })
 
 
 if __name__ == '__main__':
+    start_watcher()
     app.run(host='0.0.0.0', port=5000)
@@ -14,14 +14,24 @@ else:
 
 from .exceptions import *
 from .instastorysaver import Instaloader as Instaloader
-from .instastorysavercontext import (InstaloaderContext as InstaloaderContext,
+from .instastorysavercontext import (BandwidthLimiter as BandwidthLimiter,
+                                 InstaloaderContext as InstaloaderContext,
                                  RateController as RateController)
+from .commentstore import CommentStore as CommentStore
+from .diskwriter import DiskWriter as DiskWriter
 from .lateststamps import LatestStamps as LatestStamps
+from .metadataarchive import (ArchiveRecord as ArchiveRecord,
+                              MetadataArchive as MetadataArchive,
+                              load_structure_from_archive as load_structure_from_archive)
 from .nodeiterator import (NodeIterator as NodeIterator,
                            FrozenNodeIterator as FrozenNodeIterator,
                            resumable_iteration as resumable_iteration)
+from .scheduler import (CapturePriority as CapturePriority,
+                        CaptureScheduler as CaptureScheduler,
+                        CaptureTask as CaptureTask)
 from .structures import (Hashtag as Hashtag,
                          Highlight as Highlight,
+                         ImageResolution as ImageResolution,
                          Post as Post,
                          PostSidecarNode as PostSidecarNode,
                          PostComment as PostComment,
@@ -34,5 +44,6 @@ from .structures import (Hashtag as Hashtag,
                          TitlePic as TitlePic,
                          load_structure_from_file as load_structure_from_file,
                          save_structure_to_file as save_structure_to_file,
+                         serialize_structure as serialize_structure,
                          load_structure as load_structure,
                          get_json_structure as get_json_structure)
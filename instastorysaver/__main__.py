@@ -7,14 +7,16 @@ import re
 import sys
 from argparse import ArgumentParser, ArgumentTypeError, SUPPRESS
 from enum import IntEnum
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
-from . import (AbortDownloadException, BadCredentialsException, Instaloader, InstaloaderException,
-               InvalidArgumentException, LoginException, Post, Profile, ProfileNotExistsException, StoryItem,
-               TwoFactorAuthRequiredException, __version__, load_structure_from_file)
+from . import (AbortDownloadException, BadCredentialsException, BandwidthLimiter, ImageResolution, Instaloader,
+               InstaloaderException, InvalidArgumentException, LoginException, MetadataArchive, Post, Profile,
+               ProfileNotExistsException, StoryItem, TwoFactorAuthRequiredException, __version__,
+               load_structure_from_file)
 from .instastorysaver import (get_default_session_filename, get_default_stamps_filename)
 from .instastorysavercontext import default_user_agent
 from .lateststamps import LatestStamps
+from .structures import JsonExportable
 try:
     import browser_cookie3  # type: ignore  # optional dependency; ignore if missing in current env
     bc3_library = True
@@ -52,6 +54,13 @@ def http_status_code_list(code_list_str: str) -> List[int]:
     return codes
 
 
+def image_resolution(spec: str) -> ImageResolution:
+    try:
+        return ImageResolution.from_string(spec)
+    except InvalidArgumentException as err:
+        raise ArgumentTypeError(str(err)) from err
+
+
 def filterstr_to_filterfunc(filter_str: str, item_type: type):
     """Takes an --post-filter=... or --storyitem-filter=... filter
      specification and makes a filter_func Callable out of it."""
@@ -211,27 +220,35 @@ def _main(instaloader: Instaloader, targetlist: List[str],
     try:
         # Generate set of profiles, already downloading non-profile targets
         for target in targetlist:
-            if (target.endswith('.json') or target.endswith('.json.xz')) and os.path.isfile(target):
+            if target.endswith(('.json', '.json.xz', '.json.gz', '.sqlite')) and os.path.isfile(target):
+                structures: Iterable[JsonExportable] = []
                 with instaloader.context.error_catcher(target):
-                    structure = load_structure_from_file(instaloader.context, target)
-                    if isinstance(structure, Post):
-                        if post_filter is not None and not post_filter(structure):
-                            instaloader.context.log("<{} ({}) skipped>".format(structure, target), flush=True)
-                            continue
-                        instaloader.context.log("Downloading {} ({})".format(structure, target))
-                        instaloader.download_post(structure, os.path.dirname(target))
-                    elif isinstance(structure, StoryItem):
-                        if storyitem_filter is not None and not storyitem_filter(structure):
-                            instaloader.context.log("<{} ({}) skipped>".format(structure, target), flush=True)
-                            continue
-                        instaloader.context.log("Attempting to download {} ({})".format(structure, target))
-                        instaloader.download_storyitem(structure, os.path.dirname(target))
-                    elif isinstance(structure, Profile):
-                        raise InvalidArgumentException("Profile JSON are ignored. Pass \"{}\" to download that profile"
-                                                       .format(structure.username))
+                    if target.endswith('.sqlite'):
+                        # Listed before downloading, which may write to the same archive
+                        with MetadataArchive(target, read_only=True) as archive:
+                            structures = list(archive.structures(instaloader.context, ('Post', 'StoryItem')))
                     else:
-                        raise InvalidArgumentException("{} JSON file not supported as target"
-                                                       .format(structure.__class__.__name__))
+                        structures = [load_structure_from_file(instaloader.context, target)]
+                for structure in structures:
+                    with instaloader.context.error_catcher(target):
+                        if isinstance(structure, Post):
+                            if post_filter is not None and not post_filter(structure):
+                                instaloader.context.log("<{} ({}) skipped>".format(structure, target), flush=True)
+                                continue
+                            instaloader.context.log("Downloading {} ({})".format(structure, target))
+                            instaloader.download_post(structure, os.path.dirname(target))
+                        elif isinstance(structure, StoryItem):
+                            if storyitem_filter is not None and not storyitem_filter(structure):
+                                instaloader.context.log("<{} ({}) skipped>".format(structure, target), flush=True)
+                                continue
+                            instaloader.context.log("Attempting to download {} ({})".format(structure, target))
+                            instaloader.download_storyitem(structure, os.path.dirname(target))
+                        elif isinstance(structure, Profile):
+                            raise InvalidArgumentException("Profile JSON are ignored. Pass \"{}\" to download that "
+                                                           "profile".format(structure.username))
+                        else:
+                            raise InvalidArgumentException("{} JSON file not supported as target"
+                                                           .format(structure.__class__.__name__))
                 continue
             # strip '/' characters to be more shell-autocompletion-friendly
             target = target.rstrip('/')
@@ -377,7 +394,7 @@ def main():
     g_targets.add_argument('_singlepost', nargs='*', metavar="-- -shortcode",
                            help="Download the post with the given shortcode")
     g_targets.add_argument('_json', nargs='*', metavar="filename.json[.xz]",
-                           help="Re-Download the given object.")
+                           help="Re-Download the given object, or the posts and stories of a metadata.sqlite archive.")
     g_targets.add_argument('_fromfile', nargs='*', metavar="+args.txt",
                            help="Read targets (and options) from given textfile.")
 
@@ -420,7 +437,20 @@ def main():
     g_post.add_argument('--metadata-json', action='store_true',
                         help=SUPPRESS)
     g_post.add_argument('--no-compress-json', action='store_true',
-                        help='Do not xz compress JSON files, rather create pretty formatted JSONs.')
+                        help='Do not compress JSON files, rather create pretty formatted JSONs.')
+    g_post.add_argument('--metadata-profile', choices=['minimal', 'standard', 'full'], default='full',
+                        help='Fields to store in metadata JSON files: minimal (enough to download the media again), '
+                             'standard (also caption, likes, location etc.) or full (everything retrieved, default).')
+    g_post.add_argument('--metadata-archive', action='store_true',
+                        help='Store metadata JSON of posts, stories and profiles in one SQLite database {} per target '
+                             'directory instead of one file each. Pass the database as target to download its posts '
+                             'and stories again.'.format(MetadataArchive.FILENAME))
+    g_post.add_argument('--json-compression', choices=['xz', 'gzip'], default='xz',
+                        help='Compression of JSON files: xz (default, smallest) or gzip (faster). Files of either '
+                             'kind are recognized when loading.')
+    g_post.add_argument('--json-compression-level', metavar='LEVEL', type=int, choices=range(10),
+                        help='Compression level of JSON files from 0 (fastest) to 9 (smallest). Defaults to 6 for xz '
+                             'and 9 for gzip.')
     g_prof.add_argument('-s', '--stories', action='store_true',
                         help='Also download stories of each profile that is downloaded. Requires login.')
     g_prof.add_argument('--stories-only', action='store_true',
@@ -442,6 +472,8 @@ def main():
     g_cond.add_argument('--latest-stamps', nargs='?', metavar='STAMPSFILE', const=get_default_stamps_filename(),
                         help='Store the timestamps of latest media scraped for each profile. This allows updating '
                              'your personal Instagram archive even if you delete the destination directories. '
+                             'Unchanged highlights are skipped, without fetching their items if Instagram reports '
+                             'their item count and latest item along with them. '
                              'If STAMPSFILE is not provided, defaults to ' + get_default_stamps_filename())
     g_cond.add_argument('--post-filter', '--only-if', metavar='filter',
                         help='Expression that, if given, must evaluate to True for each post to be downloaded. Must be '
@@ -516,6 +548,27 @@ def main():
                             'retry logic.')
     g_how.add_argument('--no-iphone', action='store_true',
                         help='Do not attempt to download iPhone version of images and videos.')
+    g_how.add_argument('--image-resolution', type=image_resolution, metavar='POLICY',
+                       help='Choose among the renditions of pictures and video thumbnails: max:WIDTH for the largest '
+                            'not wider than WIDTH, min:WIDTH for the smallest not narrower than WIDTH, or exact:WIDTH '
+                            'for the nearest one. Defaults to the largest rendition.')
+    g_how.add_argument('--max-video-height', metavar='PIXELS', type=int,
+                       help='Do not download video versions higher than PIXELS, if Instagram offers several. '
+                            'Defaults to the highest available version.')
+    g_how.add_argument('--download-segments', metavar='N', type=int, default=1,
+                       help='Download files larger than --segment-threshold in N parallel byte ranges, which are '
+                            'resumed individually if interrupted. Defaults to 1, i.e. no segmenting.')
+    g_how.add_argument('--segment-threshold', metavar='BYTES', type=int, default=16 * 1024 * 1024,
+                       help='Minimum file size for segmented downloads. Defaults to 16 MiB.')
+    g_how.add_argument('--max-bandwidth', metavar='BYTES', type=int,
+                       help='Limit the download rate of pictures and videos to BYTES per second. Queries to Instagram '
+                            'are not affected. Defaults to no limit.')
+    g_how.add_argument('--bandwidth-burst', metavar='BYTES', type=int,
+                       help='Number of bytes that may be downloaded at full speed after an idle period when '
+                            '--max-bandwidth is given. Defaults to one second of traffic.')
+    g_how.add_argument('--write-behind', metavar='N', type=int, default=0,
+                       help='Finish files (timestamps, captions, metadata JSON) on N background threads, so that slow '
+                            'disks do not hold up downloading. Defaults to 0, i.e. finishing them right away.')
 
     g_misc = parser.add_argument_group('Miscellaneous Options')
     g_misc.add_argument('-q', '--quiet', action='store_true',
@@ -571,6 +624,10 @@ def main():
                              download_geotags=args.geotags,
                              download_comments=args.comments, save_metadata=not args.no_metadata_json,
                              compress_json=not args.no_compress_json,
+                             json_compression=args.json_compression,
+                             json_compression_level=args.json_compression_level,
+                             metadata_profile=args.metadata_profile,
+                             metadata_archive=args.metadata_archive,
                              post_metadata_txt_pattern=post_metadata_txt_pattern,
                              storyitem_metadata_txt_pattern=storyitem_metadata_txt_pattern,
                              max_connection_attempts=args.max_connection_attempts,
@@ -581,7 +638,13 @@ def main():
                              fatal_status_codes=args.abort_on,
                              iphone_support=not args.no_iphone,
                              title_pattern=args.title_pattern,
-                             sanitize_paths=args.sanitize_paths)
+                             sanitize_paths=args.sanitize_paths,
+                             download_segments=args.download_segments,
+                             segment_threshold=args.segment_threshold,
+                             bandwidth_limiter=BandwidthLimiter(args.max_bandwidth, args.bandwidth_burst),
+                             max_video_height=args.max_video_height,
+                             image_resolution=args.image_resolution,
+                             write_behind=args.write_behind)
         exit_code = _main(loader,
                           args.profile,
                           username=args.login.lower() if args.login is not None else None,
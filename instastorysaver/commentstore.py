@@ -0,0 +1,123 @@
+import json
+import os
+from typing import Any, Dict, List
+
+_UPDATABLE_FIELDS = ('text', 'likes_count', 'owner')
+
+
+def _sort_key(comment: Dict[str, Any]):
+    return -int(comment['created_at']), int(comment['id'])
+
+
+class CommentStore:
+    """Comments of a post as stored in its '_comments.json' file, indexed by ID.
+
+    Fetched comments are merged in with :meth:`merge`, which only touches the merged comment and its answers, and
+    :meth:`save` rewrites the file only if anything has changed::
+
+       store = CommentStore(filename + '_comments.json')
+       for comment in comments:
+           store.merge(comment)
+       store.save()
+
+    Comments are dicts with the keys ``id``, ``created_at``, ``text``, ``owner``, ``likes_count`` and, for comments
+    that are not answers, ``answers``. The file lists comments newest first, each with its answers newest first.
+
+    Merging costs only the merged comments, but :meth:`save` rewrites the whole file: it is a single JSON array,
+    newest first, as written by earlier versions, so new comments cannot be appended to it. The file is only
+    written if comments have changed. Sorting before writing takes about linear time, as the stored comments are in
+    file order already, followed by the merged new ones.
+
+    :param filename: Comments file, which need not exist.
+
+    .. versionadded:: 4.15"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._comments: Dict[int, Dict[str, Any]] = {}
+        self._answers: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._changed = False
+        try:
+            with open(filename, encoding='utf-8') as fp:
+                comments = json.load(fp)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            comments = []
+        for comment in comments:
+            self._load(comment)
+
+    def _load(self, comment: Dict[str, Any]) -> None:
+        comment_id = int(comment['id'])
+        answers = self._answers.setdefault(comment_id, {})
+        for answer in comment.get('answers') or []:
+            answers[int(answer['id'])] = answer
+        self._comments[comment_id] = {**comment, 'answers': []}
+
+    def __len__(self) -> int:
+        """Number of stored comments, including answers."""
+        return len(self._comments) + sum(len(answers) for answers in self._answers.values())
+
+    def __contains__(self, comment_id: object) -> bool:
+        return comment_id in self._comments
+
+    @property
+    def changed(self) -> bool:
+        """Whether comments have been merged in since the file has been loaded or saved."""
+        return self._changed
+
+    def answer_counts(self) -> Dict[int, int]:
+        """Number of stored answers by comment ID, e.g. for :meth:`Post.get_new_comments`."""
+        return {comment_id: len(self._answers.get(comment_id, ())) for comment_id in self._comments}
+
+    @staticmethod
+    def _update(stored: Dict[str, Any], comment: Dict[str, Any]) -> bool:
+        updated = False
+        for field in _UPDATABLE_FIELDS:
+            if field in comment and stored.get(field) != comment[field]:
+                stored[field] = comment[field]
+                updated = True
+        return updated
+
+    def merge(self, comment: Dict[str, Any]) -> bool:
+        """Add a comment, or update the text, owner, likes count and answers of a stored one.
+
+        Answers of a stored comment which are missing from the merged comment are kept.
+
+        :return: Whether anything has changed."""
+        comment_id = int(comment['id'])
+        stored = self._comments.get(comment_id)
+        if stored is None:
+            self._comments[comment_id] = stored = {**comment, 'answers': []}
+            changed = True
+        else:
+            changed = self._update(stored, comment)
+        answers = self._answers.setdefault(comment_id, {})
+        for answer in comment.get('answers') or []:
+            answer_id = int(answer['id'])
+            stored_answer = answers.get(answer_id)
+            if stored_answer is None:
+                answers[answer_id] = answer
+                changed = True
+            else:
+                changed = self._update(stored_answer, answer) or changed
+        self._changed = self._changed or changed
+        return changed
+
+    def comments(self) -> List[Dict[str, Any]]:
+        """Stored comments with their answers, newest first, as written to the file."""
+        answer_ids = set(answer_id for answers in self._answers.values() for answer_id in answers)
+        return [{**comment, 'answers': sorted(self._answers.get(comment_id, {}).values(), key=_sort_key)}
+                for comment_id, comment in sorted(self._comments.items(), key=lambda item: _sort_key(item[1]))
+                if comment_id not in answer_ids]
+
+    def save(self) -> bool:
+        """Write the comments file if comments have changed, replacing it as a whole.
+
+        :return: Whether the file has been written."""
+        if not self._changed:
+            return False
+        temp_filename = self.filename + '.temp'
+        with open(temp_filename, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(self.comments(), indent=4))
+        os.replace(temp_filename, self.filename)
+        self._changed = False
+        return True
@@ -0,0 +1,76 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class DiskWriter:
+    """Runs file finalization steps on background writer threads, so that slow disks do not stall downloading.
+
+    Work is passed through a bounded queue; :meth:`submit` blocks while the queue is full, which keeps memory bounded
+    and slows downloading down to the speed of the disk. Each submission returns a :class:`~concurrent.futures.Future`,
+    which completes once the work has been done, so callbacks can be attached with
+    :meth:`~concurrent.futures.Future.add_done_callback`::
+
+       writer = DiskWriter(workers=2)
+       writer.submit(os.utime, filename, (atime, mtime)).add_done_callback(lambda _: print(filename, 'done'))
+       writer.close()
+
+    Work submitted for the same file should not depend on being run in order.
+
+    :param workers: Number of writer threads.
+    :param queue_size: Maximum number of pending submissions.
+    :param error_handler: Called with a message for each failed submission, e.g. :meth:`InstaloaderContext.error`.
+
+    .. versionadded:: 4.15"""
+
+    def __init__(self, workers: int = 2, queue_size: int = 64,
+                 error_handler: Optional[Callable[[str], Any]] = None):
+        self._queue: "queue.Queue[Optional[Tuple[Future, str, Callable[[], Any]]]]" = queue.Queue(queue_size)
+        self._error_handler = error_handler
+        self._threads: List[threading.Thread] = []
+        for index in range(max(1, workers)):
+            thread = threading.Thread(target=self._work, name='diskwriter-{}'.format(index), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                future, label, action = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(action())
+                except Exception as err:  # pylint:disable=broad-except
+                    future.set_exception(err)
+                    if self._error_handler is not None:
+                        self._error_handler('{}: {}'.format(label, err) if label else str(err))
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func: Callable[..., Any], *args, label: str = '', **kwargs) -> Future:
+        """Schedule func(\\*args, \\**kwargs) on a writer thread, blocking while the queue is full.
+
+        :param label: Description prefixed to error messages, e.g. the filename.
+        :raises RuntimeError: If the writer has been closed."""
+        if not self._threads:
+            raise RuntimeError("DiskWriter is closed.")
+        future: Future = Future()
+        self._queue.put((future, label, lambda: func(*args, **kwargs)))
+        return future
+
+    def flush(self) -> None:
+        """Wait until all submitted work has been done."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Finish all submitted work and stop the writer threads."""
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
@@ -1,5 +1,4 @@
 import getpass
-import json
 import os
 import platform
 import re
@@ -7,24 +6,32 @@ import shutil
 import string
 import sys
 import tempfile
+import threading
+from concurrent.futures import Future
 from contextlib import contextmanager, suppress
 from datetime import datetime, timezone
-from functools import wraps
+from functools import lru_cache, partial, wraps
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Callable, IO, Iterator, List, Optional, Set, Union, cast
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Set, Union, cast
 from urllib.parse import urlparse
 
 import requests
 import urllib3  # type: ignore
 
+from . import jsoncodec
+from .commentstore import CommentStore
+from .diskwriter import DiskWriter
 from .exceptions import *
-from .instastorysavercontext import InstaloaderContext, RateController
+from .instastorysavercontext import BandwidthLimiter, InstaloaderContext, RateController
 from .lateststamps import LatestStamps
-from .nodeiterator import NodeIterator, resumable_iteration
+from .metadataarchive import MetadataArchive
+from .nodeiterator import FrozenNodeIterator, NodeIterator, resumable_iteration
+from .scheduler import CapturePriority, CaptureScheduler
 from .sectioniterator import SectionIterator
-from .structures import (Hashtag, Highlight, JsonExportable, Post, PostLocation, Profile, Story, StoryItem,
-                         load_structure_from_file, save_structure_to_file, PostSidecarNode, TitlePic)
+from .structures import (METADATA_PROFILES, Hashtag, Highlight, ImageResolution, JsonExportable, Post, PostLocation,
+                         Profile, Story, StoryItem, load_structure_from_file, save_structure_to_file, PostSidecarNode,
+                         TitlePic, serialize_structure)
 
 
 def _get_config_dir() -> str:
@@ -182,6 +189,52 @@ class _PostPathFormatter(_ArbitraryItemFormatter):
         return ret
 
 
+_MISSING = object()
+
+
+class _CompiledPathPattern:  # pylint:disable=too-few-public-methods
+    """Pattern such as :attr:`Instaloader.dirname_pattern`, parsed once to format many items like
+    :class:`_PostPathFormatter` does.
+
+    Fields are looked up with a single getattr, rather than evaluating properties twice with hasattr and getattr.
+    Patterns with fields that are not plain names (e.g. ``{owner.username}``, ``{}``) or with nested format specs
+    are formatted with :class:`_PostPathFormatter`."""
+
+    _field_formatter = _ArbitraryItemFormatter(None)
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self._parts = list(string.Formatter().parse(pattern))
+        self._simple = all(field is None or (field.isidentifier() and '{' not in (spec or ''))
+                           for _, field, spec, _ in self._parts)
+
+    def format(self, item: Any, force_windows_path: bool = False, **kwargs) -> str:
+        if not self._simple:
+            return _PostPathFormatter(item, force_windows_path).format(self.pattern, **kwargs)
+        formatter = self._field_formatter
+        path_item = isinstance(item, (Post, StoryItem, PostSidecarNode, TitlePic))
+        result = []
+        for literal, field, spec, conversion in self._parts:
+            result.append(literal)
+            if field is None:
+                continue
+            if field == 'filename' and path_item:
+                value: Any = "{filename}"
+            else:
+                value = getattr(item, field, _MISSING)
+                if value is _MISSING:
+                    value = kwargs[field]
+            if isinstance(value, str):
+                value = _PostPathFormatter.sanitize_path(value, force_windows_path)
+            result.append(formatter.format_field(formatter.convert_field(value, conversion), spec or ''))
+        return ''.join(result)
+
+
+@lru_cache(maxsize=64)
+def _compile_path_pattern(pattern: str) -> _CompiledPathPattern:
+    return _CompiledPathPattern(pattern)
+
+
 class Instaloader:
     """Instaloader Class.
 
@@ -199,6 +252,10 @@ class Instaloader:
     :param download_comments: :option:`--comments`
     :param save_metadata: not :option:`--no-metadata-json`
     :param compress_json: not :option:`--no-compress-json`
+    :param json_compression: :option:`--json-compression`, ``xz`` or ``gzip``
+    :param json_compression_level: :option:`--json-compression-level`, LZMA preset or gzip level, None for default
+    :param metadata_profile: :option:`--metadata-profile`, fields of metadata JSON files, see
+       :func:`get_json_structure`
     :param post_metadata_txt_pattern:
        :option:`--post-metadata-txt`, default is ``{caption}``. Set to empty string to avoid creation of post metadata
        txt file.
@@ -212,6 +269,15 @@ class Instaloader:
     :param fatal_status_codes: :option:`--abort-on`
     :param iphone_support: not :option:`--no-iphone`
     :param sanitize_paths: :option:`--sanitize-paths`
+    :param download_segments: :option:`--download-segments`, number of parallel byte ranges for large files
+    :param segment_threshold: :option:`--segment-threshold`, minimum file size (bytes) for segmented downloads
+    :param bandwidth_limiter: :class:`BandwidthLimiter` throttling media downloads, see :option:`--max-bandwidth`
+    :param max_video_height: :option:`--max-video-height`
+    :param image_resolution: :option:`--image-resolution`, an :class:`ImageResolution` or its string form
+    :param write_behind: :option:`--write-behind`, number of :class:`DiskWriter` threads finishing files in the
+       background, 0 to finish them on the downloading thread
+    :param metadata_archive: :option:`--metadata-archive`, store metadata JSON in one :class:`MetadataArchive` per
+       target directory instead of one file per post
 
     .. attribute:: context
 
@@ -242,11 +308,24 @@ class Instaloader:
                  fatal_status_codes: Optional[List[int]] = None,
                  iphone_support: bool = True,
                  title_pattern: Optional[str] = None,
-                 sanitize_paths: bool = False):
+                 sanitize_paths: bool = False,
+                 download_segments: int = 1,
+                 segment_threshold: int = 16 * 1024 * 1024,
+                 bandwidth_limiter: Optional[BandwidthLimiter] = None,
+                 max_video_height: Optional[int] = None,
+                 image_resolution: Optional[Union[ImageResolution, str]] = None,
+                 write_behind: int = 0,
+                 json_compression: str = 'xz',
+                 json_compression_level: Optional[int] = None,
+                 metadata_profile: str = 'full',
+                 metadata_archive: bool = False):
 
         self.context = InstaloaderContext(sleep, quiet, user_agent, max_connection_attempts,
                                           request_timeout, rate_controller, fatal_status_codes,
-                                          iphone_support)
+                                          iphone_support, download_segments, segment_threshold,
+                                          bandwidth_limiter, max_video_height,
+                                          ImageResolution.from_string(image_resolution)
+                                          if isinstance(image_resolution, str) else image_resolution)
 
         # configuration parameters
         self.dirname_pattern = dirname_pattern or "{target}"
@@ -260,6 +339,13 @@ class Instaloader:
             else:
                 self.title_pattern = '{target}_{date_utc}_UTC_{typename}'
         self.sanitize_paths = sanitize_paths
+        # Directories created during the current run, to call os.makedirs() only once per directory; one removed
+        # meanwhile is created again by _write_to_dir()
+        self._created_dirs: Set[str] = set()
+        self.write_behind = write_behind
+        # Finishes files (timestamps, captions, metadata JSON) in the background if write_behind > 0
+        self.disk_writer = (DiskWriter(write_behind, error_handler=self.context.error) if write_behind > 0
+                            else None)
         self.download_pictures = download_pictures
         self.download_videos = download_videos
         self.download_video_thumbnails = download_video_thumbnails
@@ -267,6 +353,18 @@ class Instaloader:
         self.download_comments = download_comments
         self.save_metadata = save_metadata
         self.compress_json = compress_json
+        if json_compression not in jsoncodec.COMPRESSIONS:
+            raise InvalidArgumentException("JSON compression must be one of {}."
+                                           .format(', '.join(jsoncodec.COMPRESSIONS)))
+        self.json_compression = json_compression
+        self.json_compression_level = json_compression_level
+        if metadata_profile not in METADATA_PROFILES:
+            raise InvalidArgumentException("Metadata profile must be one of {}.".format(', '.join(METADATA_PROFILES)))
+        self.metadata_profile = metadata_profile
+        self.metadata_archive = metadata_archive
+        # Open metadata archives by directory, closed by close()
+        self._metadata_archives: Dict[str, MetadataArchive] = {}
+        self._metadata_archives_lock = threading.Lock()
         self.post_metadata_txt_pattern = '{caption}' if post_metadata_txt_pattern is None \
             else post_metadata_txt_pattern
         self.storyitem_metadata_txt_pattern = '' if storyitem_metadata_txt_pattern is None \
@@ -315,6 +413,10 @@ class Instaloader:
             download_comments=self.download_comments,
             save_metadata=self.save_metadata,
             compress_json=self.compress_json,
+            json_compression=self.json_compression,
+            json_compression_level=self.json_compression_level,
+            metadata_profile=self.metadata_profile,
+            metadata_archive=self.metadata_archive,
             post_metadata_txt_pattern=self.post_metadata_txt_pattern,
             storyitem_metadata_txt_pattern=self.storyitem_metadata_txt_pattern,
             max_connection_attempts=self.context.max_connection_attempts,
@@ -324,16 +426,41 @@ class Instaloader:
             slide=self.slide,
             fatal_status_codes=self.context.fatal_status_codes,
             iphone_support=self.context.iphone_support,
-            sanitize_paths=self.sanitize_paths)
+            sanitize_paths=self.sanitize_paths,
+            download_segments=self.context.download_segments,
+            segment_threshold=self.context.segment_threshold,
+            bandwidth_limiter=self.context.bandwidth_limiter,
+            max_video_height=self.context.max_video_height,
+            image_resolution=self.context.image_resolution,
+            write_behind=self.write_behind)
         yield new_loader
         self.context.error_log.extend(new_loader.context.error_log)
         new_loader.context.error_log = []  # avoid double-printing of errors
         new_loader.close()
 
     def close(self):
-        """Close associated session objects and repeat error log."""
+        """Finish pending writes, close associated session objects and repeat error log.
+
+        .. versionchanged:: 4.15
+           Waits for the :attr:`disk_writer` and closes metadata archives."""
+        if self.disk_writer is not None:
+            self.disk_writer.close()
+        with self._metadata_archives_lock:
+            archives, self._metadata_archives = self._metadata_archives, {}
+        for archive in archives.values():
+            archive.close()
         self.context.close()
 
+    def _write_behind(self, label: str, func: Callable[..., Any], *args) -> Future:
+        """Call func(\\*args) on the :attr:`disk_writer`, or right away if there is none.
+
+        :return: Future of the call, already done if there is no disk writer."""
+        if self.disk_writer is None:
+            future: Future = Future()
+            future.set_result(self._write_to_dir(label, func, *args))
+            return future
+        return self.disk_writer.submit(self._write_to_dir, label, func, *args, label=label)
+
     def __enter__(self):
         return self
 
@@ -363,23 +490,54 @@ class Instaloader:
         if filename != nominal_filename and os.path.isfile(filename):
             self.context.log(filename + ' exists', end=' ', flush=True)
             return False
-        self.context.write_raw(resp, filename)
-        os.utime(filename, (datetime.now().timestamp(), mtime.timestamp()))
+        self._write_to_dir(filename, self.context.write_raw, resp, filename)
+        self._write_behind(filename, os.utime, filename, (datetime.now().timestamp(), mtime.timestamp()))
         return True
 
+    def get_metadata_archive(self, dirname: str) -> MetadataArchive:
+        """The :class:`MetadataArchive` of a target directory, opened on first use and closed by :meth:`close`.
+
+        .. versionadded:: 4.15"""
+        with self._metadata_archives_lock:
+            archive = self._metadata_archives.get(dirname)
+            if archive is None:
+                self._makedirs(dirname)
+                archive = MetadataArchive(os.path.join(dirname, MetadataArchive.FILENAME),
+                                          self.json_compression if self.compress_json else None,
+                                          self.json_compression_level)
+                self._metadata_archives[dirname] = archive
+            return archive
+
     def save_metadata_json(self, filename: str, structure: JsonExportable) -> None:
-        """Saves metadata JSON file of a structure."""
+        """Saves metadata JSON file of a structure.
+
+        .. versionchanged:: 4.15
+           Saves to the directory's :class:`MetadataArchive` instead if :attr:`metadata_archive` is set."""
+        if self.metadata_archive and not isinstance(structure, FrozenNodeIterator):
+            archive = self.get_metadata_archive(os.path.dirname(filename) or '.')
+            # Serialized on the calling thread, as the structure may still change; compressed and written behind
+            self._write_behind(archive.filename, archive.write, archive.encode(structure, self.metadata_profile))
+            if isinstance(structure, (Post, StoryItem)):
+                self.context.log('json', end=' ', flush=True)
+            return
         if self.compress_json:
-            filename += '.json.xz'
+            filename += '.json' + jsoncodec.COMPRESSIONS[self.json_compression]
         else:
             filename += '.json'
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        save_structure_to_file(structure, filename)
+        self._makedirs(os.path.dirname(filename))
+        # Serialized on the calling thread, as the structure may still change; compressed and written behind
+        self._write_behind(filename, jsoncodec.write_file, filename,
+                           serialize_structure(structure, filename, self.metadata_profile), self.json_compression_level)
         if isinstance(structure, (Post, StoryItem)):
             # log 'json ' message when saving Post or StoryItem
             self.context.log('json', end=' ', flush=True)
 
     def update_comments(self, filename: str, post: Post) -> None:
+        """Merges the comments of a post into its '_comments.json' file, see :class:`CommentStore`.
+
+        .. versionchanged:: 4.15
+           Merges by comment ID, iterates :meth:`Post.get_new_comments` to stop at known comments, and only writes the
+           file if comments have changed."""
         def _postcommentanswer_asdict(comment):
             return {'id': comment.id,
                     'created_at': int(comment.created_at_utc.replace(tzinfo=timezone.utc).timestamp()),
@@ -389,27 +547,7 @@ class Instaloader:
 
         def _postcomment_asdict(comment):
             return {**_postcommentanswer_asdict(comment),
-                    'answers': sorted([_postcommentanswer_asdict(answer) for answer in comment.answers],
-                                      key=lambda t: int(t['id']),
-                                      reverse=True)}
-
-        def get_unique_comments(comments, combine_answers=False):
-            if not comments:
-                return list()
-            comments_list = sorted(sorted(list(comments), key=lambda t: int(t['id'])),
-                                   key=lambda t: int(t['created_at']), reverse=True)
-            unique_comments_list = [comments_list[0]]
-            for x, y in zip(comments_list[:-1], comments_list[1:]):
-                if x['id'] != y['id']:
-                    unique_comments_list.append(y)
-                else:
-                    unique_comments_list[-1]['likes_count'] = y.get('likes_count')
-                    if combine_answers:
-                        combined_answers = unique_comments_list[-1].get('answers') or list()
-                        if 'answers' in y:
-                            combined_answers.extend(y['answers'])
-                        unique_comments_list[-1]['answers'] = get_unique_comments(combined_answers)
-            return unique_comments_list
+                    'answers': [_postcommentanswer_asdict(answer) for answer in comment.answers]}
 
         def get_new_comments(new_comments, start):
             for idx, comment in enumerate(new_comments, start=start+1):
@@ -417,20 +555,8 @@ class Instaloader:
                     self.context.log('{}'.format(idx), end='…', flush=True)
                 yield comment
 
-        def save_comments(extended_comments):
-            unique_comments = get_unique_comments(extended_comments, combine_answers=True)
-            answer_ids = set(int(answer['id']) for comment in unique_comments for answer in comment.get('answers', []))
-            with open(filename, 'w') as file:
-                file.write(json.dumps(list(filter(lambda t: int(t['id']) not in answer_ids, unique_comments)),
-                                      indent=4))
-
         base_filename = filename
-        filename += '_comments.json'
-        try:
-            with open(filename) as fp:
-                comments = json.load(fp)
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
-            comments = list()
+        store = CommentStore(filename + '_comments.json')
 
         comments_iterator = post.get_comments()
         try:
@@ -443,14 +569,15 @@ class Instaloader:
                     check_bbd=self.check_resume_bbd,
                     enabled=self.resume_prefix is not None
             ) as (_is_resuming, start_index):
-                comments.extend(_postcomment_asdict(comment)
-                                for comment in get_new_comments(comments_iterator, start_index))
+                # Stops at known comments and fetches only changed answer threads
+                for comment in get_new_comments(post.get_new_comments(store.answer_counts(),
+                                                                      comments=comments_iterator), start_index):
+                    store.merge(_postcomment_asdict(comment))
         except (KeyboardInterrupt, AbortDownloadException):
-            if comments:
-                save_comments(comments)
+            self._write_to_dir(store.filename, store.save)
             raise
-        if comments:
-            save_comments(comments)
+        if len(store):
+            self._write_to_dir(store.filename, store.save)
             self.context.log('comments', end=' ', flush=True)
 
     def save_caption(self, filename: str, mtime: datetime, caption: str) -> None:
@@ -543,10 +670,10 @@ class Instaloader:
             pic_bytes = http_response.content
         ig_filename = url.split('/')[-1].split('?')[0]
         pic_data = TitlePic(owner_profile, target, name_suffix, ig_filename, date_object)
-        dirname = _PostPathFormatter(pic_data, self.sanitize_paths).format(self.dirname_pattern, target=target)
+        dirname = _compile_path_pattern(self.dirname_pattern).format(pic_data, self.sanitize_paths, target=target)
         filename_template = os.path.join(
                 dirname,
-                _PostPathFormatter(pic_data, self.sanitize_paths).format(self.title_pattern, target=target))
+                _compile_path_pattern(self.title_pattern).format(pic_data, self.sanitize_paths, target=target))
         filename = self.__prepare_filename(filename_template, lambda: url) + ".jpg"
         content_length = http_response.headers.get('Content-Length', None)
         if os.path.isfile(filename) and (not self.context.is_logged_in or
@@ -554,8 +681,8 @@ class Instaloader:
                                           os.path.getsize(filename) >= int(content_length))):
             self.context.log(filename + ' already exists')
             return
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        self.context.write_raw(pic_bytes if pic_bytes else http_response, filename)
+        self._makedirs(os.path.dirname(filename))
+        self._write_to_dir(filename, self.context.write_raw, pic_bytes if pic_bytes else http_response, filename)
         if date_object:
             os.utime(filename, (datetime.now().timestamp(), date_object.timestamp()))
         self.context.log('')  # log output of _get_and_write_raw() does not produce \n
@@ -675,8 +802,30 @@ class Instaloader:
         .. versionadded:: 4.2"""
         self.context.two_factor_login(two_factor_code)
 
-    @staticmethod
-    def __prepare_filename(filename_template: str, url: Callable[[], str]) -> str:
+    def _makedirs(self, dirname: str) -> None:
+        """os.makedirs(dirname, exist_ok=True), skipped for directories created since :meth:`_forget_created_dirs`."""
+        if dirname not in self._created_dirs:
+            os.makedirs(dirname, exist_ok=True)
+            self._created_dirs.add(dirname)
+
+    def _forget_created_dirs(self) -> None:
+        """Called at the start of each run, e.g. :meth:`download_profiles`."""
+        self._created_dirs.clear()
+
+    def _write_to_dir(self, filename: str, func: Callable[..., Any], *args) -> Any:
+        """Call func(\\*args), which writes filename. If the directory of filename has been removed since it has been
+        created, create it again and retry once."""
+        try:
+            return func(*args)
+        except FileNotFoundError:
+            dirname = os.path.dirname(filename)
+            if not dirname or os.path.isdir(dirname):
+                raise
+            self._created_dirs.discard(dirname)
+            self._makedirs(dirname)
+            return func(*args)
+
+    def __prepare_filename(self, filename_template: str, url: Callable[[], str]) -> str:
         """Replace filename token inside filename_template with url's filename and assure the directories exist.
 
         .. versionadded:: 4.6"""
@@ -685,24 +834,37 @@ class Instaloader:
                                                  os.path.splitext(os.path.basename(urlparse(url()).path))[0])
         else:
             filename = filename_template
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        self._makedirs(os.path.dirname(filename))
         return filename
 
     def format_filename(self, item: Union[Post, StoryItem, PostSidecarNode, TitlePic],
-                        target: Optional[Union[str, Path]] = None):
+                        target: Optional[Union[str, Path]] = None, *, filename_pattern: Optional[str] = None):
         """Format filename of a :class:`Post` or :class:`StoryItem` according to ``filename-pattern`` parameter.
 
-        .. versionadded:: 4.1"""
-        return _PostPathFormatter(item, self.sanitize_paths).format(self.filename_pattern, target=target)
+        .. versionadded:: 4.1
+
+        .. versionchanged:: 4.15
+           Add keyword-only `filename_pattern` parameter to override the instance's pattern."""
+        return _compile_path_pattern(filename_pattern or self.filename_pattern).format(item, self.sanitize_paths,
+                                                                                       target=target)
 
-    def download_post(self, post: Post, target: Union[str, Path]) -> bool:
+    def download_post(self, post: Post, target: Union[str, Path],
+                      *, dirname_pattern: Optional[str] = None, filename_pattern: Optional[str] = None) -> bool:
         """
         Download everything associated with one instagram post node, i.e. picture, caption and video.
 
         :param post: Post to download.
         :param target: Target name, i.e. profile name, #hashtag, :feed; for filename.
+        :param dirname_pattern: Overrides :attr:`dirname_pattern` for this call.
+        :param filename_pattern: Overrides :attr:`filename_pattern` for this call.
         :return: True if something was downloaded, False otherwise, i.e. file was already there
+
+        .. versionchanged:: 4.15
+           Add keyword-only `dirname_pattern` and `filename_pattern` parameters, which allow concurrent calls with
+           different destinations without changing the instance.
         """
+        dirname_pattern = dirname_pattern or self.dirname_pattern
+        filename_pattern = filename_pattern or self.filename_pattern
 
         def _already_downloaded(path: str) -> bool:
             if not os.path.isfile(path):
@@ -712,7 +874,7 @@ class Instaloader:
                 return True
 
         def _all_already_downloaded(path_base, is_videos_enumerated) -> bool:
-            if '{filename}' in self.filename_pattern:
+            if '{filename}' in filename_pattern:
                 # full URL needed to evaluate actual filename, cannot determine at
                 # this point if all sidecar nodes were already downloaded.
                 return False
@@ -725,8 +887,8 @@ class Instaloader:
                         return False
             return True
 
-        dirname = _PostPathFormatter(post, self.sanitize_paths).format(self.dirname_pattern, target=target)
-        filename_template = os.path.join(dirname, self.format_filename(post, target=target))
+        dirname = _compile_path_pattern(dirname_pattern).format(post, self.sanitize_paths, target=target)
+        filename_template = os.path.join(dirname, self.format_filename(post, target, filename_pattern=filename_pattern))
         filename = self.__prepare_filename(filename_template, lambda: post.url)
 
         # Download the image(s) / video thumbnail and videos within sidecars if desired
@@ -745,7 +907,7 @@ class Instaloader:
                             start=self.slide_start % post.mediacount + 1
                     ):
                         suffix: Optional[str] = str(edge_number)
-                        if '{filename}' in self.filename_pattern:
+                        if '{filename}' in filename_pattern:
                             suffix = None
                         if self.download_pictures and (not sidecar_node.is_video or self.download_video_thumbnails):
                             # pylint:disable=cell-var-from-loop
@@ -754,12 +916,16 @@ class Instaloader:
                             # Download sidecar picture or video thumbnail (--no-pictures implies --no-video-thumbnails)
                             downloaded &= self.download_pic(filename=sidecar_filename, url=sidecar_node.display_url,
                                                             mtime=post.date_local, filename_suffix=suffix)
-                        if sidecar_node.is_video and self.download_videos:
+                        if sidecar_node.is_video and sidecar_node.video_url is None and self.download_videos:
+                            self.context.error("Unable to resolve video URL of {} [{}/{}]."
+                                               .format(post, edge_number, post.mediacount))
+                            downloaded = False
+                        elif sidecar_node.is_video and sidecar_node.video_url is not None and self.download_videos:
+                            video_url: str = sidecar_node.video_url
                             # pylint:disable=cell-var-from-loop
-                            sidecar_filename = self.__prepare_filename(filename_template,
-                                                                       lambda: sidecar_node.video_url)
+                            sidecar_filename = self.__prepare_filename(filename_template, lambda: video_url)
                             # Download sidecar video if desired
-                            downloaded &= self.download_pic(filename=sidecar_filename, url=sidecar_node.video_url,
+                            downloaded &= self.download_pic(filename=sidecar_filename, url=video_url,
                                                             mtime=post.date_local, filename_suffix=suffix)
                 else:
                     downloaded = False
@@ -780,7 +946,7 @@ class Instaloader:
         # Save caption if desired
         metadata_string = _ArbitraryItemFormatter(post).format(self.post_metadata_txt_pattern).strip()
         if metadata_string:
-            self.save_caption(filename=filename, mtime=post.date_local, caption=metadata_string)
+            self._write_behind(filename, self.save_caption, filename, post.date_local, metadata_string)
 
         # Download video if desired
         if post.is_video and self.download_videos:
@@ -789,7 +955,7 @@ class Instaloader:
 
         # Download geotags if desired
         if self.download_geotags and post.location:
-            self.save_location(filename, post.location, post.date_local)
+            self._write_behind(filename, self.save_location, filename, post.location, post.date_local)
 
         # Update comments if desired
         if self.download_comments:
@@ -803,21 +969,46 @@ class Instaloader:
         return downloaded
 
     @_requires_login
-    def get_stories(self, userids: Optional[List[int]] = None) -> Iterator[Story]:
+    def get_stories(self, userids: Optional[List[int]] = None,
+                    latest_stamps: Optional[LatestStamps] = None) -> Iterator[Story]:
         """Get available stories from followees or all stories of users whose ID are given.
         Does not mark stories as seen.
         To use this, one needs to be logged in
 
         :param userids: List of user IDs to be processed in terms of downloading their stories, or None.
+        :param latest_stamps: Database with the last times each user was scraped. Users whose latest story is not
+               newer, according to the stories tray, are omitted without requesting their stories.
         :raises LoginRequiredException: If called without being logged in.
+
+        .. versionchanged:: 4.15
+           iPhone versions of the stories are requested for up to 50 users at once.
+           Add `latest_stamps` parameter.
         """
 
-        if not userids:
+        tray = None
+        if not userids or latest_stamps is not None:
             data = self.context.graphql_query("d15efd8c0c5b23f0ef71f18bf363c704",
                                               {"only_stories": True})["data"]["user"]
             if data is None:
                 raise BadResponseException('Bad stories reel JSON.')
-            userids = list(edge["node"]["id"] for edge in data["feed_reels_tray"]["edge_reels_tray_to_reel"]["edges"])
+            tray = [edge["node"] for edge in data["feed_reels_tray"]["edge_reels_tray_to_reel"]["edges"]]
+        if not userids:
+            assert tray is not None
+            userids = [node["id"] for node in tray]
+        if latest_stamps is not None:
+            assert tray is not None
+            unchanged = set()
+            for node in tray:
+                owner = node.get('user') or node.get('owner') or {}
+                if not node.get('latest_reel_media') or 'username' not in owner:
+                    continue
+                last_scraped = latest_stamps.get_last_story_timestamp(owner['username'].lower())
+                if datetime.fromtimestamp(node['latest_reel_media']).astimezone() <= last_scraped:
+                    unchanged.add(int(node['id']))
+            if unchanged:
+                self.context.log("Skipping {} users without new stories.".format(
+                    sum(int(userid) in unchanged for userid in userids)))
+            userids = [userid for userid in userids if int(userid) not in unchanged]
 
         def _userid_chunks():
             assert userids is not None
@@ -825,10 +1016,24 @@ class Instaloader:
             for i in range(0, len(userids), userids_per_query):
                 yield userids[i:i + userids_per_query]
 
+        def _iphone_reels(userid_chunk) -> Dict[str, Any]:
+            # One iPhone request for the whole chunk instead of one per Story
+            if not self.context.iphone_support:
+                return {}
+            try:
+                return self.context.get_iphone_json('api/v1/feed/reels_media/',
+                                                    {'reel_ids': [str(userid) for userid in userid_chunk]})['reels']
+            except (InstaloaderException, KeyError) as err:
+                self.context.error("Unable to fetch iPhone version of {} stories: {}".format(len(userid_chunk), err),
+                                   repeat_at_end=False)
+                return {}
+
         for userid_chunk in _userid_chunks():
             stories = self.context.graphql_query("303a4ae99711322310f25250d988f3b7",
                                                  {"reel_ids": userid_chunk, "precomposed_overlay": False})["data"]
-            yield from (Story(self.context, media) for media in stories['reels_media'])
+            iphone_reels = _iphone_reels(userid_chunk) if stories['reels_media'] else {}
+            yield from (Story(self.context, media, iphone_reels.get(str(media['user']['id'])))
+                        for media in stories['reels_media'])
 
     @_requires_login
     def download_stories(self,
@@ -852,51 +1057,89 @@ class Instaloader:
 
         .. versionchanged:: 4.8
            Add `latest_stamps` parameter.
+
+        .. versionchanged:: 4.15
+           Users without stories newer than their latest stamp are skipped before requesting their stories.
+           Items of all users are downloaded in the order of their expiry, see :class:`CaptureScheduler`.
         """
 
         if not userids:
             self.context.log("Retrieving all visible stories...")
-            profile_count = None
-        else:
+        scheduler = CaptureScheduler()
+        self._schedule_stories(scheduler, userids, fast_update, filename_target, storyitem_filter, latest_stamps)
+        scheduler.run()
+
+    def _schedule_stories(self,
+                          scheduler: CaptureScheduler,
+                          userids: Optional[List[Union[int, Profile]]],
+                          fast_update: bool,
+                          filename_target: Optional[str],
+                          storyitem_filter: Optional[Callable[[StoryItem], bool]],
+                          latest_stamps: Optional[LatestStamps]) -> None:
+        """Retrieve the stories of given users and schedule their items by :attr:`StoryItem.expiring_utc`, followed
+        by updating each user's latest stamp."""
+        profile_count = None
+        if userids:
             userids = [p if isinstance(p, int) else p.userid for p in userids]
             profile_count = len(userids)
 
-        for i, user_story in enumerate(self.get_stories(userids), start=1):
+        def _schedule_story(user_story: Story) -> None:
             name = user_story.owner_username
-            if profile_count is not None:
-                msg = "[{0:{w}d}/{1:{w}d}] Retrieving stories from profile {2}.".format(i, profile_count, name,
-                                                                                        w=len(str(profile_count)))
-            else:
-                msg = "[{:3d}] Retrieving stories from profile {}.".format(i, name)
-            self.context.log(msg)
-            totalcount = user_story.itemcount
-            count = 1
+            target = filename_target if filename_target else name
+            scraped_timestamp = datetime.now().astimezone()
+            items = list(user_story.get_items())
             if latest_stamps is not None:
-                # pylint:disable=cell-var-from-loop
                 last_scraped = latest_stamps.get_last_story_timestamp(name)
-                scraped_timestamp = datetime.now().astimezone()
-            for item in user_story.get_items():
-                if latest_stamps is not None:
-                    if item.date_local <= last_scraped:
-                        break
+                # Items are ordered newest first
+                items = items[:next((i for i, item in enumerate(items) if item.date_local <= last_scraped),
+                                    len(items))]
+            progress = {'count': 1, 'stopped': False}
+
+            def _download(item: StoryItem) -> None:
+                if progress['stopped']:
+                    return
                 if storyitem_filter is not None and not storyitem_filter(item):
                     self.context.log("<{} skipped>".format(item), flush=True)
-                    continue
-                self.context.log("[%3i/%3i] " % (count, totalcount), end="", flush=True)
-                count += 1
+                    return
+                self.context.log("[%3i/%3i] " % (progress['count'], len(items)), end="", flush=True)
+                progress['count'] += 1
                 with self.context.error_catcher('Download story from user {}'.format(name)):
-                    downloaded = self.download_storyitem(item, filename_target if filename_target else name)
+                    downloaded = self.download_storyitem(item, target)
                     if fast_update and not downloaded:
-                        break
+                        progress['stopped'] = True
+
+            for item in items:
+                scheduler.add(CapturePriority.STORY, partial(_download, item), item.expiring_utc,
+                              'Download story from user {}'.format(name))
             if latest_stamps is not None:
-                latest_stamps.set_last_story_timestamp(name, scraped_timestamp)
+                assert latest_stamps is not None
+                # Scheduled after the user's items, since it has the latest deadline and was added last
+                scheduler.add(CapturePriority.STORY,
+                              partial(latest_stamps.set_last_story_timestamp, name, scraped_timestamp),
+                              max((item.expiring_utc for item in items), default=None),
+                              'Update latest stamps of {}'.format(name))
+
+        for i, user_story in enumerate(self.get_stories(cast(Optional[List[int]], userids), latest_stamps), start=1):
+            if profile_count is not None:
+                msg = "[{0:{w}d}/{1:{w}d}] Retrieving stories from profile {2}.".format(
+                    i, profile_count, user_story.owner_username, w=len(str(profile_count)))
+            else:
+                msg = "[{:3d}] Retrieving stories from profile {}.".format(i, user_story.owner_username)
+            self.context.log(msg)
+            _schedule_story(user_story)
 
-    def download_storyitem(self, item: StoryItem, target: Union[str, Path]) -> bool:
+    def download_storyitem(self, item: StoryItem, target: Union[str, Path],
+                           *, dirname_pattern: Optional[str] = None, filename_pattern: Optional[str] = None) -> bool:
         """Download one user story.
 
         :param item: Story item, as in story['items'] for story in :meth:`get_stories`
         :param target: Replacement for {target} in dirname_pattern and filename_pattern
+        :param dirname_pattern: Overrides :attr:`dirname_pattern` for this call.
+        :param filename_pattern: Overrides :attr:`filename_pattern` for this call.
         :return: True if something was downloaded, False otherwise, i.e. file was already there
+
+        .. versionchanged:: 4.15
+           Add keyword-only `dirname_pattern` and `filename_pattern` parameters.
         """
 
         def _already_downloaded(path: str) -> bool:
@@ -907,8 +1150,9 @@ class Instaloader:
                 return True
 
         date_local = item.date_local
-        dirname = _PostPathFormatter(item, self.sanitize_paths).format(self.dirname_pattern, target=target)
-        filename_template = os.path.join(dirname, self.format_filename(item, target=target))
+        dirname = _compile_path_pattern(dirname_pattern or self.dirname_pattern).format(item, self.sanitize_paths,
+                                                                                        target=target)
+        filename_template = os.path.join(dirname, self.format_filename(item, target, filename_pattern=filename_pattern))
         filename = self.__prepare_filename(filename_template, lambda: item.url)
         downloaded = False
         video_url_fetch_failed = False
@@ -926,7 +1170,7 @@ class Instaloader:
         # Save caption if desired
         metadata_string = _ArbitraryItemFormatter(item).format(self.storyitem_metadata_txt_pattern).strip()
         if metadata_string:
-            self.save_caption(filename=filename, mtime=item.date_local, caption=metadata_string)
+            self._write_behind(filename, self.save_caption, filename, item.date_local, metadata_string)
         # Save metadata as JSON if desired.
         if self.save_metadata is not False:
             self.save_metadata_json(filename, item)
@@ -959,7 +1203,9 @@ class Instaloader:
                             user: Union[int, Profile],
                             fast_update: bool = False,
                             filename_target: Optional[str] = None,
-                            storyitem_filter: Optional[Callable[[StoryItem], bool]] = None) -> None:
+                            storyitem_filter: Optional[Callable[[StoryItem], bool]] = None,
+                            batch_size: int = 20,
+                            latest_stamps: Optional[LatestStamps] = None) -> None:
         """
         Download available highlights from a user whose ID is given.
         To use this, one needs to be logged in.
@@ -969,15 +1215,44 @@ class Instaloader:
         .. versionchanged:: 4.3
            Also downloads and saves the Highlight's cover pictures.
 
+        .. versionchanged:: 4.15
+           Items of *batch_size* highlights are fetched at once, see :meth:`Highlight.prefetch`.
+           Add `latest_stamps` parameter.
+
         :param user: ID or Profile of the user whose highlights should get downloaded.
         :param fast_update: If true, abort when first already-downloaded picture is encountered
         :param filename_target: Replacement for {target} in dirname_pattern and filename_pattern
                or None if profile name and the highlights' titles should be used instead
         :param storyitem_filter: function(storyitem), which returns True if given StoryItem should be downloaded
+        :param batch_size: Number of highlights whose items are requested with a single query
+        :param latest_stamps: Database with the item count and latest item of each downloaded highlight. Highlights
+               which have not changed since are skipped, without fetching their items if their
+               :attr:`Highlight.fingerprint` is known beforehand, and of changed highlights only the new items are
+               downloaded.
         :raises LoginRequiredException: If called without being logged in.
         """
-        for user_highlight in self.get_highlights(user):
+        def unchanged(highlight: Highlight) -> bool:
+            fingerprint = highlight.fingerprint
+            if (latest_stamps is None or fingerprint is None or
+                    fingerprint != latest_stamps.get_highlight_fingerprint(highlight.owner_username,
+                                                                           highlight.unique_id)):
+                return False
+            self.context.log("Highlights \"{}\" from profile {} unchanged.".format(highlight.title,
+                                                                                  highlight.owner_username))
+            return True
+
+        # Highlights whose node tells they are unchanged are skipped before fetching their items
+        user_highlights = [highlight for highlight in self.get_highlights(user) if not unchanged(highlight)]
+        Highlight.prefetch(self.context, user_highlights, batch_size)
+        for user_highlight in user_highlights:
             name = user_highlight.owner_username
+            items = list(user_highlight.get_items())
+            # Without a fingerprint in its node, a highlight is only known to be unchanged once its items are fetched
+            if unchanged(user_highlight):
+                continue
+            fingerprint = user_highlight.fingerprint
+            stored_fingerprint = (latest_stamps.get_highlight_fingerprint(name, user_highlight.unique_id)
+                                  if latest_stamps is not None else None)
             highlight_target: Union[str, Path] = (filename_target
                                 if filename_target
                                 else (Path(_PostPathFormatter.sanitize_path(name, self.sanitize_paths)) /
@@ -985,19 +1260,34 @@ class Instaloader:
                                                                        self.sanitize_paths)))
             self.context.log("Retrieving highlights \"{}\" from profile {}".format(user_highlight.title, name))
             self.download_highlight_cover(user_highlight, highlight_target)
-            totalcount = user_highlight.itemcount
+            if fingerprint is not None and stored_fingerprint is not None:
+                # Items may also be added to a highlight from the story archive, i.e. with an older date. Only if
+                # the newer items account for all added items, the older ones are known to be downloaded already.
+                new_items = [item for item in items if item.date_utc.timestamp() > stored_fingerprint[1]]
+                if len(new_items) >= fingerprint[0] - stored_fingerprint[0]:
+                    items = new_items
+            totalcount = len(items)
             count = 1
-            for item in user_highlight.get_items():
+            # Only a highlight whose items have all been downloaded is stamped
+            complete = True
+            for item in items:
                 if storyitem_filter is not None and not storyitem_filter(item):
                     self.context.log("<{} skipped>".format(item), flush=True)
+                    complete = False
                     continue
                 self.context.log("[%3i/%3i] " % (count, totalcount), end="", flush=True)
                 count += 1
+                succeeded = False
                 with self.context.error_catcher('Download highlights \"{}\" from user {}'.format(user_highlight.title,
                                                                                                  name)):
                     downloaded = self.download_storyitem(item, highlight_target)
-                    if fast_update and not downloaded:
-                        break
+                    succeeded = True
+                complete &= succeeded
+                if fast_update and succeeded and not downloaded:
+                    complete = False
+                    break
+            if latest_stamps is not None and fingerprint is not None and complete:
+                latest_stamps.set_highlight_fingerprint(name, user_highlight.unique_id, fingerprint)
 
     def posts_download_loop(self,
                             posts: Iterator[Post],
@@ -1445,7 +1735,7 @@ class Instaloader:
                           stories: bool = False,
                           fast_update: bool = False,
                           post_filter: Optional[Callable[[Post], bool]] = None,
-                          storyitem_filter: Optional[Callable[[Post], bool]] = None,
+                          storyitem_filter: Optional[Callable[[StoryItem], bool]] = None,
                           raise_errors: bool = False,
                           latest_stamps: Optional[LatestStamps] = None,
                           max_count: Optional[int] = None,
@@ -1482,8 +1772,14 @@ class Instaloader:
 
         .. versionchanged:: 4.14
            Add `reels` parameter.
+
+        .. versionchanged:: 4.15
+           Stories are retrieved first and their items downloaded by expiry, followed by the highlights and then the
+           posts of all profiles, see :class:`CaptureScheduler`.
         """
 
+        self._forget_created_dirs()
+
         @contextmanager
         def _error_raiser(_str):
             yield
@@ -1491,6 +1787,64 @@ class Instaloader:
         # error_handler type is Callable[[Optional[str]], ContextManager[None]] (not supported with Python 3.5.0..3.5.3)
         error_handler = _error_raiser if raise_errors else self.context.error_catcher
 
+        scheduler = CaptureScheduler()
+
+        # Stories expire after 24 hours, so retrieve them before any profile and download their items first
+        if stories and profiles:
+            with self.context.error_catcher("Download stories"):
+                self.context.log("Retrieving stories")
+                self._schedule_stories(scheduler, list(profiles), fast_update=fast_update, filename_target=None,
+                                       storyitem_filter=storyitem_filter, latest_stamps=latest_stamps)
+
+        def _schedule_profile(profile: Profile) -> None:
+            profile_name = profile.username
+
+            def _download_tagged() -> None:
+                with self.context.error_catcher('Download tagged of {}'.format(profile_name)):
+                    self.download_tagged(profile, fast_update=fast_update, post_filter=post_filter,
+                                         latest_stamps=latest_stamps)
+
+            def _download_reels() -> None:
+                with self.context.error_catcher('Download reels of {}'.format(profile_name)):
+                    self.download_reels(profile, fast_update=fast_update, post_filter=post_filter,
+                                        latest_stamps=latest_stamps)
+
+            def _download_igtv() -> None:
+                with self.context.error_catcher('Download IGTV of {}'.format(profile_name)):
+                    self.download_igtv(profile, fast_update=fast_update, post_filter=post_filter,
+                                       latest_stamps=latest_stamps)
+
+            def _download_highlights() -> None:
+                with self.context.error_catcher('Download highlights of {}'.format(profile_name)):
+                    self.download_highlights(profile, fast_update=fast_update, storyitem_filter=storyitem_filter,
+                                             latest_stamps=latest_stamps)
+
+            def _download_posts() -> None:
+                # Iterate over pictures and download them
+                self.context.log("Retrieving posts from profile {}.".format(profile_name))
+                posts_takewhile: Optional[Callable[[Post], bool]] = None
+                if latest_stamps is not None:
+                    last_scraped = latest_stamps.get_last_post_timestamp(profile_name)
+                    posts_takewhile = lambda p: p.date_local > last_scraped
+                posts_to_download = profile.get_posts()
+                self.posts_download_loop(posts_to_download, profile_name, fast_update, post_filter,
+                                         total_count=profile.mediacount, owner_profile=profile,
+                                         takewhile=posts_takewhile, possibly_pinned=3, max_count=max_count)
+                if latest_stamps is not None and posts_to_download.first_item is not None:
+                    latest_stamps.set_last_post_timestamp(profile_name,
+                                                          posts_to_download.first_item.date_local)
+
+            if highlights:
+                scheduler.add(CapturePriority.HIGHLIGHT, _download_highlights, label=profile_name)
+            if tagged:
+                scheduler.add(CapturePriority.POST, _download_tagged, label=profile_name)
+            if reels:
+                scheduler.add(CapturePriority.POST, _download_reels, label=profile_name)
+            if igtv:
+                scheduler.add(CapturePriority.POST, _download_igtv, label=profile_name)
+            if posts:
+                scheduler.add(CapturePriority.POST, _download_posts, label=profile_name)
+
         for i, profile in enumerate(profiles, start=1):
             self.context.log("[{0:{w}d}/{1:{w}d}] Downloading profile {2}".format(i, len(profiles), profile.username,
                                                                                   w=len(str(len(profiles)))))
@@ -1519,50 +1873,10 @@ class Instaloader:
                             not profile.followed_by_viewer):
                         raise PrivateProfileNotFollowedException("Private but not followed.")
 
-                # Download tagged, if requested
-                if tagged:
-                    with self.context.error_catcher('Download tagged of {}'.format(profile_name)):
-                        self.download_tagged(profile, fast_update=fast_update, post_filter=post_filter,
-                                             latest_stamps=latest_stamps)
-
-                # Download reels, if requested
-                if reels:
-                    with self.context.error_catcher('Download reels of {}'.format(profile_name)):
-                        self.download_reels(profile, fast_update=fast_update, post_filter=post_filter,
-                                           latest_stamps=latest_stamps)
-
-                # Download IGTV, if requested
-                if igtv:
-                    with self.context.error_catcher('Download IGTV of {}'.format(profile_name)):
-                        self.download_igtv(profile, fast_update=fast_update, post_filter=post_filter,
-                                           latest_stamps=latest_stamps)
-
-                # Download highlights, if requested
-                if highlights:
-                    with self.context.error_catcher('Download highlights of {}'.format(profile_name)):
-                        self.download_highlights(profile, fast_update=fast_update, storyitem_filter=storyitem_filter)
+                _schedule_profile(profile)
 
-                # Iterate over pictures and download them
-                if posts:
-                    self.context.log("Retrieving posts from profile {}.".format(profile_name))
-                    posts_takewhile: Optional[Callable[[Post], bool]] = None
-                    if latest_stamps is not None:
-                        # pylint:disable=cell-var-from-loop
-                        last_scraped = latest_stamps.get_last_post_timestamp(profile_name)
-                        posts_takewhile = lambda p: p.date_local > last_scraped
-                    posts_to_download = profile.get_posts()
-                    self.posts_download_loop(posts_to_download, profile_name, fast_update, post_filter,
-                                             total_count=profile.mediacount, owner_profile=profile,
-                                             takewhile=posts_takewhile, possibly_pinned=3, max_count=max_count)
-                    if latest_stamps is not None and posts_to_download.first_item is not None:
-                        latest_stamps.set_last_post_timestamp(profile_name,
-                                                              posts_to_download.first_item.date_local)
-
-        if stories and profiles:
-            with self.context.error_catcher("Download stories"):
-                self.context.log("Downloading stories")
-                self.download_stories(userids=list(profiles), fast_update=fast_update, filename_target=None,
-                                      storyitem_filter=storyitem_filter, latest_stamps=latest_stamps)
+        # Stories by expiry, then highlights, then tagged, reels, IGTV and posts of all profiles
+        scheduler.run(error_handler)
 
     def download_profile(self, profile_name: Union[str, Profile],
                          profile_pic: bool = True, profile_pic_only: bool = False,
@@ -2,27 +2,33 @@ import json
 import os
 import pickle
 import random
-import shutil
 import sys
 import textwrap
+import threading
 import time
 import urllib.parse
 import uuid
-from contextlib import contextmanager, suppress
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext, suppress
 from datetime import datetime, timedelta
 from functools import partial
-from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import requests
 import requests.utils
 
+from . import jsoncodec
 from .exceptions import *
 
 
 def copy_session(session: requests.Session, request_timeout: Optional[float] = None) -> requests.Session:
     """Duplicates a requests.Session."""
     new = requests.Session()
-    new.cookies = requests.utils.cookiejar_from_dict(requests.utils.dict_from_cookiejar(session.cookies))
+    # Hold the jar's own lock, which http.cookiejar takes while storing cookies of a response, so that a concurrent
+    # request on session does not change the jar while it is being copied
+    cookies_lock = getattr(session.cookies, '_cookies_lock', None)
+    with cookies_lock if cookies_lock is not None else nullcontext():
+        new.cookies = requests.utils.cookiejar_from_dict(requests.utils.dict_from_cookiejar(session.cookies))
     new.headers = session.headers.copy()  # type: ignore
     # Override default timeout behavior.
     # Need to silence mypy bug for this. See: https://github.com/python/mypy/issues/2427
@@ -63,6 +69,10 @@ def default_iphone_headers() -> Dict[str, Any]:
             'x-whatsapp': '0'}
 
 
+class _RangeNotSatisfiedError(Exception):
+    """Raised internally if a server answers a byte range request with the complete file."""
+
+
 class InstaloaderContext:
     """Class providing methods for (error) logging and low-level communication with Instagram.
 
@@ -76,13 +86,26 @@ class InstaloaderContext:
 
     Further, it provides methods for logging in and general session handles, which are used by that routines in
     class :class:`Instaloader`.
+
+    The request and download methods may be called from multiple threads at once. Shared state (the error log,
+    the iPhone headers, the caches, the cookie jar and the rate controller's bookkeeping) is guarded by locks or
+    replaced copy-on-write. Logging in, loading a session and :meth:`anonymous_copy` swap the session and must
+    not run concurrently with other calls.
+
+    .. versionchanged:: 4.15
+       Made thread-safe.
     """
 
     def __init__(self, sleep: bool = True, quiet: bool = False, user_agent: Optional[str] = None,
                  max_connection_attempts: int = 3, request_timeout: float = 300.0,
                  rate_controller: Optional[Callable[["InstaloaderContext"], "RateController"]] = None,
                  fatal_status_codes: Optional[List[int]] = None,
-                 iphone_support: bool = True):
+                 iphone_support: bool = True,
+                 download_segments: int = 1,
+                 segment_threshold: int = 16 * 1024 * 1024,
+                 bandwidth_limiter: Optional["BandwidthLimiter"] = None,
+                 max_video_height: Optional[int] = None,
+                 image_resolution: Optional[Tuple[str, int]] = None):
 
         self.user_agent = user_agent if user_agent is not None else default_user_agent()
         self.request_timeout = request_timeout
@@ -95,8 +118,12 @@ class InstaloaderContext:
         self._graphql_page_length = 50
         self.two_factor_auth_pending = None
         self.iphone_support = iphone_support
+        # Replaced rather than updated in place when the server sends new values, so readers need no lock
         self.iphone_headers = default_iphone_headers()
 
+        # Guards error_log, iphone_headers updates and _segment_sessions
+        self._lock = threading.RLock()
+
         # error log, filled with error() and printed at the end of Instaloader.main()
         self.error_log: List[str] = []
 
@@ -108,9 +135,28 @@ class InstaloaderContext:
         # HTTP status codes that should cause an AbortDownloadException
         self.fatal_status_codes = fatal_status_codes or []
 
-        # Cache profile from id (mapping from id to Profile)
+        # Cache profile from id (mapping from id to Profile); entries are only ever added, which is atomic
         self.profile_id_cache: Dict[int, Any] = dict()
 
+        # Number of parallel byte ranges for files of at least segment_threshold bytes; 1 disables segmenting
+        self.download_segments = max(1, download_segments)
+        self.segment_threshold = segment_threshold
+        # Idle keep-alive sessions for segmented downloads, each leased to one download at a time
+        self._segment_sessions: List[requests.Session] = []
+
+        # Token bucket shared by all media downloads
+        self.bandwidth_limiter = bandwidth_limiter if bandwidth_limiter is not None else BandwidthLimiter()
+        # Settings of the job running on each thread, see bandwidth_limit() and image_resolution_policy(). They are
+        # thread-local, so that concurrent jobs sharing this context do not see each other's settings.
+        self._job = threading.local()
+
+        # Highest video version to select from the dimensions given in the iPhone struct, None for no cap
+        self.max_video_height = max_video_height
+        # Content-Length of URLs probed with HEAD requests as a fallback for video version selection
+        self._content_length_cache: Dict[str, int] = dict()
+        # Policy for choosing among image renditions (a structures.ImageResolution), None for the largest one
+        self._image_resolution = image_resolution
+
     @contextmanager
     def anonymous_copy(self):
         session = self._session
@@ -130,6 +176,63 @@ class InstaloaderContext:
             self.user_id = user_id
             self.iphone_headers = iphone_headers
 
+    @contextmanager
+    def bandwidth_limit(self, rate: Optional[float], burst: Optional[float] = None):
+        """Additionally limit media downloads of the calling thread within the context to rate bytes per second.
+
+        The global :attr:`bandwidth_limiter` still applies, i.e. the effective rate is the minimum of both. Jobs
+        running concurrently on other threads keep their own limits.
+
+        .. versionadded:: 4.15"""
+        job_limiter = self._job_bandwidth_limiter()
+        self._job.bandwidth_limiter = BandwidthLimiter(rate, burst) if rate else None
+        try:
+            yield self
+        finally:
+            self._job.bandwidth_limiter = job_limiter
+
+    def _job_bandwidth_limiter(self) -> Optional["BandwidthLimiter"]:
+        return getattr(self._job, 'bandwidth_limiter', None)
+
+    @property
+    def image_resolution(self) -> Optional[Tuple[str, int]]:
+        """Policy for choosing among image renditions, None for the largest one.
+
+        Within :meth:`image_resolution_policy`, the policy of the calling thread's job."""
+        job_resolution = getattr(self._job, 'image_resolution', None)
+        return job_resolution if job_resolution is not None else self._image_resolution
+
+    @image_resolution.setter
+    def image_resolution(self, image_resolution: Optional[Tuple[str, int]]):
+        self._image_resolution = image_resolution
+
+    @contextmanager
+    def image_resolution_policy(self, image_resolution: Optional[Tuple[str, int]]):
+        """Choose image renditions of the calling thread within the context by the given policy, if not None.
+
+        Jobs running concurrently on other threads keep their own policy.
+
+        .. versionadded:: 4.15"""
+        job_resolution = getattr(self._job, 'image_resolution', None)
+        self._job.image_resolution = image_resolution
+        try:
+            yield self
+        finally:
+            self._job.image_resolution = job_resolution
+
+    def throttle(self, nbytes: int, job_limiter: Optional["BandwidthLimiter"] = None) -> None:
+        """Account nbytes of downloaded media, sleeping if a bandwidth limit is exceeded.
+
+        :param job_limiter: Limiter of the job on whose behalf another thread downloads; by default the one set by
+           :meth:`bandwidth_limit` on the calling thread.
+
+        .. versionadded:: 4.15"""
+        self.bandwidth_limiter.consume(nbytes)
+        if job_limiter is None:
+            job_limiter = self._job_bandwidth_limiter()
+        if job_limiter is not None:
+            job_limiter.consume(nbytes)
+
     @property
     def is_logged_in(self) -> bool:
         """True, if this Instaloader instance is logged in."""
@@ -147,7 +250,8 @@ class InstaloaderContext:
         :param repeat_at_end: Set to false if the message should be printed, but not repeated at program termination."""
         print(msg, file=sys.stderr)
         if repeat_at_end:
-            self.error_log.append(msg)
+            with self._lock:
+                self.error_log.append(msg)
 
     @property
     def has_stored_errors(self) -> bool:
@@ -158,11 +262,16 @@ class InstaloaderContext:
 
     def close(self):
         """Print error log and close session"""
-        if self.error_log and not self.quiet:
+        with self._lock:
+            error_log = list(self.error_log)
+            segment_sessions, self._segment_sessions = self._segment_sessions, []
+        if error_log and not self.quiet:
             print("\nErrors or warnings occurred:", file=sys.stderr)
-            for err in self.error_log:
+            for err in error_log:
                 print(err, file=sys.stderr)
         self._session.close()
+        for segment_session in segment_sessions:
+            segment_session.close()
 
     @contextmanager
     def error_catcher(self, extra_info: Optional[str] = None):
@@ -213,7 +322,7 @@ class InstaloaderContext:
 
     def save_session(self):
         """Not meant to be used directly, use :meth:`Instaloader.save_session`."""
-        return requests.utils.dict_from_cookiejar(self._session.cookies)
+        return requests.utils.dict_from_cookiejar(copy_session(self._session).cookies)
 
     def update_cookies(self, cookie):
         """.. versionadded:: 4.11"""
@@ -455,7 +564,7 @@ class InstaloaderContext:
             if resp.status_code != 200:
                 raise ConnectionException(self._response_error(resp))
             else:
-                resp_json = resp.json()
+                resp_json = jsoncodec.loads(resp.content)
             if 'status' in resp_json and resp_json['status'] != "ok":
                 raise ConnectionException(self._response_error(resp))
             return resp_json
@@ -642,26 +751,164 @@ class InstaloaderContext:
             response = self.get_json(path, params, 'i.instagram.com', tempsession, response_headers=response_headers)
 
             # Extract the ig-set-* headers and use them in the next request
+            new_headers = dict()
             for key, value in response_headers.items():
                 if key.startswith('ig-set-'):
-                    self.iphone_headers[key.replace('ig-set-', '')] = value
+                    new_headers[key.replace('ig-set-', '')] = value
                 elif key.startswith('x-ig-set-'):
-                    self.iphone_headers[key.replace('x-ig-set-', 'x-ig-')] = value
+                    new_headers[key.replace('x-ig-set-', 'x-ig-')] = value
+            if new_headers:
+                with self._lock:
+                    self.iphone_headers = {**self.iphone_headers, **new_headers}
 
             return response
 
     def write_raw(self, resp: Union[bytes, requests.Response], filename: str) -> None:
         """Write raw response data into a file.
 
-        .. versionadded:: 4.2.1"""
+        .. versionadded:: 4.2.1
+
+        .. versionchanged:: 4.15
+           Large responses are fetched in parallel byte ranges if :attr:`download_segments` is greater than 1.
+           Downloads are throttled by :attr:`bandwidth_limiter`."""
         self.log(filename, end=' ', flush=True)
+        if isinstance(resp, requests.Response) and self._is_segmentable(resp):
+            size = int(resp.headers['Content-Length'])
+            url = resp.url
+            resp.close()
+            try:
+                self._write_raw_segmented(url, size, filename)
+                return
+            except _RangeNotSatisfiedError:
+                self.error("Warning: {} ignored byte range request, downloading in one piece.".format(url),
+                           repeat_at_end=False)
+                resp = self.get_raw(url)
         with open(filename + '.temp', 'wb') as file:
             if isinstance(resp, requests.Response):
-                shutil.copyfileobj(resp.raw, file)
+                while True:
+                    chunk = resp.raw.read(64 * 1024)
+                    if not chunk:
+                        break
+                    file.write(chunk)
+                    self.throttle(len(chunk))
             else:
                 file.write(resp)
         os.replace(filename + '.temp', filename)
 
+    def _is_segmentable(self, resp: requests.Response) -> bool:
+        if self.download_segments <= 1:
+            return False
+        if resp.headers.get('Accept-Ranges', '').lower() != 'bytes' or 'Content-Encoding' in resp.headers:
+            return False
+        try:
+            return int(resp.headers.get('Content-Length', 0)) >= self.segment_threshold
+        except ValueError:
+            return False
+
+    def _take_segment_sessions(self, count: int) -> List[requests.Session]:
+        """Idle sessions for the segments of one download, reused across downloads but never shared between
+        concurrent ones. Return them with :meth:`_return_segment_sessions`."""
+        with self._lock:
+            sessions, self._segment_sessions = self._segment_sessions[:count], self._segment_sessions[count:]
+        return sessions + [self.get_anonymous_session() for _ in range(count - len(sessions))]
+
+    def _return_segment_sessions(self, sessions: List[requests.Session]) -> None:
+        with self._lock:
+            self._segment_sessions.extend(sessions)
+
+    def _write_raw_segmented(self, url: str, size: int, filename: str) -> None:
+        """Download url in :attr:`download_segments` parallel byte ranges into a preallocated temp file.
+
+        Progress of each segment is stored next to the temp file, so that an interrupted download only refetches
+        the missing parts of each segment. A failed segment is resumed up to :attr:`max_connection_attempts` times."""
+        temp_filename = filename + '.temp'
+        state_filename = filename + '.segments'
+        count = self.download_segments
+        bounds = [(i * size // count, (i + 1) * size // count - 1) for i in range(count)]
+        done = [0] * count
+        with suppress(FileNotFoundError, ValueError, KeyError, json.decoder.JSONDecodeError):
+            with open(state_filename) as state_file:
+                state = json.load(state_file)
+            if (state['size'] == size and len(state['done']) == count and os.path.isfile(temp_filename) and
+                    os.path.getsize(temp_filename) == size):
+                done = state['done']
+        if not any(done):
+            with open(temp_filename, 'wb') as file:
+                file.truncate(size)
+        saved = list(done)
+        state_lock = threading.Lock()
+        # The segments are fetched on worker threads on behalf of the calling thread's job
+        job_limiter = self._job_bandwidth_limiter()
+
+        def save_state():
+            with open(state_filename, 'w') as state_file:
+                json.dump({'size': size, 'done': done}, state_file)
+
+        def fetch_segment(index: int) -> None:
+            for attempt in range(1, self.max_connection_attempts + 1):
+                try:
+                    fetch_range(index)
+                    return
+                except (QueryReturnedForbiddenException, QueryReturnedNotFoundException):
+                    raise
+                except (ConnectionException, requests.exceptions.RequestException) as err:
+                    # Progress is kept, so the next attempt only requests the rest of the segment
+                    error_string = "Segment {} of {}: {}".format(index + 1, url, err)
+                    if attempt == self.max_connection_attempts:
+                        raise ConnectionException(error_string) from err
+                    self.error(error_string + " [retrying]", repeat_at_end=False)
+
+        def fetch_range(index: int) -> None:
+            first, last = bounds[index]
+            if first + done[index] > last:
+                return
+            resp = sessions[index].get(url, stream=True,
+                                       headers={'Range': 'bytes={}-{}'.format(first + done[index], last)})
+            with resp:
+                if resp.status_code == 200:
+                    raise _RangeNotSatisfiedError()
+                if resp.status_code == 403:
+                    raise QueryReturnedForbiddenException(self._response_error(resp))
+                if resp.status_code == 404:
+                    raise QueryReturnedNotFoundException(self._response_error(resp))
+                if resp.status_code != 206:
+                    raise ConnectionException(self._response_error(resp))
+                with open(temp_filename, 'r+b') as file:
+                    file.seek(first + done[index])
+                    for chunk in resp.iter_content(chunk_size=256 * 1024):
+                        file.write(chunk)
+                        file.flush()
+                        self.throttle(len(chunk), job_limiter)
+                        with state_lock:
+                            done[index] += len(chunk)
+                            if done[index] - saved[index] >= 4 * 1024 * 1024:
+                                saved[index] = done[index]
+                                save_state()
+            if first + done[index] <= last:
+                raise ConnectionException("ended prematurely")
+
+        sessions = self._take_segment_sessions(count)
+        executor = ThreadPoolExecutor(max_workers=count)
+        futures = [executor.submit(fetch_segment, i) for i in range(count)]
+        try:
+            for future in futures:
+                future.result()
+        except _RangeNotSatisfiedError:
+            executor.shutdown(wait=True, cancel_futures=True)
+            with suppress(FileNotFoundError):
+                os.remove(state_filename)
+            raise
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            save_state()
+            raise
+        finally:
+            self._return_segment_sessions(sessions)
+        executor.shutdown()
+        os.replace(temp_filename, filename)
+        with suppress(FileNotFoundError):
+            os.remove(state_filename)
+
     def get_raw(self, url: str, _attempt=1) -> requests.Response:
         """Downloads a file anonymously.
 
@@ -692,6 +939,27 @@ class InstaloaderContext:
         :raises ConnectionException: When download repeatedly failed."""
         self.write_raw(self.get_raw(url), filename)
 
+    def content_lengths(self, urls: List[str]) -> Dict[str, int]:
+        """Content-Length of given URLs, determined by parallel HEAD requests and cached by URL.
+
+        URLs whose HEAD request fails are logged and omitted from the result.
+
+        .. versionadded:: 4.15"""
+        missing = [url for url in urls if url not in self._content_length_cache]
+
+        def probe(url: str) -> int:
+            return int(self.head(url, allow_redirects=True).headers.get('Content-Length', 0))
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(len(missing), 8)) as executor:
+                futures = {url: executor.submit(probe, url) for url in missing}
+                for url, future in futures.items():
+                    try:
+                        self._content_length_cache[url] = future.result()
+                    except (InstaloaderException, requests.exceptions.RequestException, ValueError) as err:
+                        self.error(f"Unable to determine size of {url}: {err}")
+        return {url: self._content_length_cache[url] for url in urls if url in self._content_length_cache}
+
     def head(self, url: str, allow_redirects: bool = False) -> requests.Response:
         """HEAD a URL anonymously.
 
@@ -715,6 +983,75 @@ class InstaloaderContext:
             raise ConnectionException(self._response_error(resp))
 
 
+class BandwidthLimiter:
+    """
+    Token bucket limiting the throughput of media downloads to a number of bytes per second.
+
+    A limiter may be shared between several :class:`Instaloader` instances and its rate may be changed with
+    :meth:`set_rate` while downloads are running::
+
+       limiter = instaloader.BandwidthLimiter(2 * 1024 * 1024)
+       L = instaloader.Instaloader(bandwidth_limiter=limiter)
+       ...
+       limiter.set_rate(None)  # unlimited
+
+    :param rate: Sustained rate in bytes per second, or None for no limit.
+    :param burst: Number of bytes that may be downloaded at once after an idle period. Defaults to one second of
+       traffic.
+
+    .. versionadded:: 4.15
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._rate: Optional[float] = None
+        self._burst = 0.0
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self.set_rate(rate, burst)
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Sustained rate in bytes per second, or None if unlimited."""
+        return self._rate
+
+    @property
+    def burst(self) -> float:
+        """Bucket capacity in bytes."""
+        return self._burst
+
+    def set_rate(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        """Change rate and burst allowance. Takes effect for all subsequently downloaded chunks."""
+        with self._lock:
+            self._rate = rate if rate is not None and rate > 0 else None
+            self._burst = float(burst if burst is not None else (self._rate or 0.0))
+            self._tokens = min(self._tokens, self._burst) if self._rate is not None else self._burst
+            self._last_refill = time.monotonic()
+
+    def sleep(self, secs: float):
+        """Wait given number of seconds."""
+        time.sleep(secs)
+
+    def consume(self, nbytes: int) -> None:
+        """Take nbytes from the bucket, waiting until the debt has been refilled if the bucket runs empty."""
+        with self._lock:
+            if self._rate is None:
+                return
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            self._tokens -= nbytes
+            waittime = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if waittime > 0:
+            self.sleep(waittime)
+
+
+def _nth_oldest(timestamps: List[float], n: int) -> float:
+    # Queries reserved by wait_before_query() for later may exceed the count per window; the next query then has to
+    # wait until all but the newest (count - 1) of them have left the window, rather than only the oldest one
+    return sorted(timestamps)[n]
+
+
 class RateController:
     """
     Class providing request tracking and rate controlling to stay within rate limits.
@@ -733,6 +1070,8 @@ class RateController:
 
     def __init__(self, context: InstaloaderContext):
         self._context = context
+        # Guards the bookkeeping below; not held while sleeping
+        self._lock = threading.RLock()
         self._query_timestamps: Dict[str, List[float]] = dict()
         self._earliest_next_request_time = 0.0
         self._iphone_earliest_next_request_time = 0.0
@@ -748,7 +1087,9 @@ class RateController:
         self._context.error("Number of requests within last {} minutes grouped by type:"
                             .format('/'.join(str(w) for w in windows)),
                             repeat_at_end=False)
-        for query_type, times in self._query_timestamps.items():
+        with self._lock:
+            query_timestamps = {query_type: list(times) for query_type, times in self._query_timestamps.items()}
+        for query_type, times in query_timestamps.items():
             reqs_in_sliding_window = [sum(t > current_time - w * 60 for t in times) for w in windows]
             self._context.error(" {} {:>32}: {}".format(
                 "*" if query_type == failed_query_type else " ",
@@ -779,6 +1120,10 @@ class RateController:
 
     def query_waittime(self, query_type: str, current_time: float, untracked_queries: bool = False) -> float:
         """Calculate time needed to wait before query can be executed."""
+        with self._lock:
+            return self._query_waittime(query_type, current_time, untracked_queries)
+
+    def _query_waittime(self, query_type: str, current_time: float, untracked_queries: bool) -> float:
         per_type_sliding_window = 660
         iphone_sliding_window = 1800
         if query_type not in self._query_timestamps:
@@ -788,10 +1133,12 @@ class RateController:
 
         def per_type_next_request_time():
             reqs_in_sliding_window = self._reqs_in_sliding_window(query_type, current_time, per_type_sliding_window)
-            if len(reqs_in_sliding_window) < self.count_per_sliding_window(query_type):
+            count_per_sliding_window = self.count_per_sliding_window(query_type)
+            if len(reqs_in_sliding_window) < count_per_sliding_window:
                 return 0.0
             else:
-                return min(reqs_in_sliding_window) + per_type_sliding_window + 6
+                return (_nth_oldest(reqs_in_sliding_window, len(reqs_in_sliding_window) - count_per_sliding_window) +
+                        per_type_sliding_window + 6)
 
         def gql_accumulated_next_request_time():
             if query_type in ['iphone', 'other']:
@@ -802,7 +1149,8 @@ class RateController:
             if len(reqs_in_sliding_window) < gql_accumulated_max_count:
                 return 0.0
             else:
-                return min(reqs_in_sliding_window) + gql_accumulated_sliding_window
+                return (_nth_oldest(reqs_in_sliding_window, len(reqs_in_sliding_window) - gql_accumulated_max_count) +
+                        gql_accumulated_sliding_window)
 
         def untracked_next_request_time():
             if untracked_queries:
@@ -820,7 +1168,8 @@ class RateController:
             if query_type == "iphone":
                 reqs_in_sliding_window = self._reqs_in_sliding_window(query_type, current_time, iphone_sliding_window)
                 if len(reqs_in_sliding_window) >= 199:
-                    return min(reqs_in_sliding_window) + iphone_sliding_window + 18
+                    return (_nth_oldest(reqs_in_sliding_window, len(reqs_in_sliding_window) - 199) +
+                            iphone_sliding_window + 18)
             return 0.0
 
         return max(0.0,
@@ -835,9 +1184,16 @@ class RateController:
         """This method is called before a query to Instagram.
 
         It calls :meth:`RateController.query_waittime` to determine the time needed to wait and then calls
-        :meth:`RateController.sleep` to wait until the request can be made."""
-        waittime = self.query_waittime(query_type, time.monotonic(), False)
-        assert waittime >= 0
+        :meth:`RateController.sleep` to wait until the request can be made.
+
+        .. versionchanged:: 4.15
+           The request is tracked at the time it will be made, in the same critical section in which the waiting time
+           is determined, so that concurrent queries cannot exceed the rate limits together."""
+        with self._lock:
+            current_time = time.monotonic()
+            waittime = self.query_waittime(query_type, current_time, False)
+            assert waittime >= 0
+            self._query_timestamps.setdefault(query_type, []).append(current_time + waittime)
         if waittime > 15:
             formatted_waittime = ("{} seconds".format(round(waittime)) if waittime <= 666 else
                                   "{} minutes".format(round(waittime / 60)))
@@ -845,10 +1201,6 @@ class RateController:
                               .format(formatted_waittime, datetime.now() + timedelta(seconds=waittime)))
         if waittime > 0:
             self.sleep(waittime)
-        if query_type not in self._query_timestamps:
-            self._query_timestamps[query_type] = [time.monotonic()]
-        else:
-            self._query_timestamps[query_type].append(time.monotonic())
 
     def handle_429(self, query_type: str) -> None:
         """This method is called to handle a 429 Too Many Requests response.
@@ -0,0 +1,90 @@
+import gzip
+import json
+import lzma
+from typing import Any, Optional, Union
+
+try:
+    import orjson  # type: ignore  # optional dependency, several times faster than json
+    orjson_library = True
+except ImportError:  # pragma: no cover - optional path
+    orjson = None  # type: ignore
+    orjson_library = False
+
+# Supported values of Instaloader.json_compression, and the file extension used for each
+COMPRESSIONS = {'xz': '.xz', 'gzip': '.gz'}
+
+_XZ_MAGIC = b'\xfd7zXZ\x00'
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON.
+
+    :raises json.JSONDecodeError: If data is not valid JSON."""
+    if orjson_library:
+        # pylint:disable=no-member
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, pretty: bool = False) -> str:
+    """Encode obj as compact JSON, or as indented JSON with sorted keys if pretty is set.
+
+    Pretty output is always produced by the json module, so that uncompressed files keep their layout."""
+    if pretty:
+        return json.dumps(obj, indent=4, sort_keys=True)
+    if orjson_library:
+        # pylint:disable=no-member
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def is_compressed(filename: str) -> bool:
+    """Whether a JSON file of this name is written compressed, judging by its extension."""
+    return filename.endswith(tuple(COMPRESSIONS.values()))
+
+
+def write_file(filename: str, data: str, compression_level: Optional[int] = None) -> None:
+    """Write JSON text to filename as UTF-8, compressed according to its extension ('.xz' or '.gz').
+
+    :param compression_level: LZMA preset or gzip level (0-9); lower is faster. None for the library default."""
+    if filename.endswith(COMPRESSIONS['xz']):
+        with lzma.open(filename, 'wt', encoding='utf-8', check=lzma.CHECK_NONE, preset=compression_level) as fp:
+            fp.write(data)
+    elif filename.endswith(COMPRESSIONS['gzip']):
+        with gzip.open(filename, 'wt', encoding='utf-8',
+                       compresslevel=9 if compression_level is None else compression_level) as fp:
+            fp.write(data)
+    else:
+        with open(filename, 'wt', encoding='utf-8') as fp:
+            fp.write(data)
+
+
+def compress(data: str, compression: Optional[str] = None, compression_level: Optional[int] = None) -> bytes:
+    """Encode JSON text, compressed with 'xz', 'gzip' or not at all (None), for storing it elsewhere than in a file.
+
+    :param compression_level: LZMA preset or gzip level (0-9); lower is faster. None for the library default."""
+    if compression == 'xz':
+        return lzma.compress(data.encode(), check=lzma.CHECK_NONE, preset=compression_level)
+    if compression == 'gzip':
+        return gzip.compress(data.encode(), compresslevel=9 if compression_level is None else compression_level)
+    return data.encode()
+
+
+def decompress(data: bytes) -> Any:
+    """Decode JSON that has been encoded by :func:`compress` or read from a file written by :func:`write_file`.
+
+    Compression is detected from the content."""
+    if data.startswith(_XZ_MAGIC):
+        data = lzma.decompress(data)
+    elif data.startswith(_GZIP_MAGIC):
+        data = gzip.decompress(data)
+    return loads(data)
+
+
+def load_file(filename: str) -> Any:
+    """Decode a JSON file written by :func:`write_file`.
+
+    Compression is detected from the file's content rather than its name."""
+    with open(filename, 'rb') as fp:
+        return decompress(fp.read())
@@ -1,6 +1,6 @@
 import configparser
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from os.path import dirname
 from os import makedirs
 
@@ -20,6 +20,7 @@ class LatestStamps:
     IGTV_TIMESTAMP = 'igtv-timestamp'
     REELS_TIMESTAMP = 'reels-timestamp'
     STORY_TIMESTAMP = 'story-timestamp'
+    HIGHLIGHT_FINGERPRINT_PREFIX = 'highlight-'
     ISO_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
 
     def __init__(self, latest_stamps_file):
@@ -53,8 +54,11 @@ class LatestStamps:
     def rename_profile(self, old_profile: str, new_profile: str):
         """Renames a profile."""
         self._ensure_section(new_profile)
+        highlight_options = [option for option in
+                             (self.data.options(old_profile) if self.data.has_section(old_profile) else [])
+                             if option.startswith(self.HIGHLIGHT_FINGERPRINT_PREFIX)]
         for option in [self.PROFILE_ID, self.PROFILE_PIC, self.POST_TIMESTAMP,
-                       self.TAGGED_TIMESTAMP, self.IGTV_TIMESTAMP, self.STORY_TIMESTAMP]:
+                       self.TAGGED_TIMESTAMP, self.IGTV_TIMESTAMP, self.STORY_TIMESTAMP] + highlight_options:
             if self.data.has_option(old_profile, option):
                 value = self.data.get(old_profile, option)
                 self.data.set(new_profile, option, value)
@@ -112,6 +116,26 @@ class LatestStamps:
         """Sets timestamp of last download of a profile's stories."""
         self._set_timestamp(profile_name, self.STORY_TIMESTAMP, timestamp)
 
+    def get_highlight_fingerprint(self, profile_name: str, highlight_id: int) -> Optional[Tuple[int, int]]:
+        """Returns item count and timestamp of latest item of a highlight when it was last downloaded.
+
+        .. versionadded:: 4.15"""
+        try:
+            fingerprint = self.data.get(profile_name, self.HIGHLIGHT_FINGERPRINT_PREFIX + str(highlight_id))
+            count, latest = fingerprint.split(',')
+            return int(count), int(latest)
+        except (configparser.Error, ValueError):
+            return None
+
+    def set_highlight_fingerprint(self, profile_name: str, highlight_id: int, fingerprint: Tuple[int, int]):
+        """Sets item count and timestamp of latest item of a downloaded highlight.
+
+        .. versionadded:: 4.15"""
+        self._ensure_section(profile_name)
+        self.data.set(profile_name, self.HIGHLIGHT_FINGERPRINT_PREFIX + str(highlight_id),
+                      '{},{}'.format(*fingerprint))
+        self._save()
+
     def get_profile_pic(self, profile_name: str) -> str:
         """Returns filename of profile's last downloaded profile pic."""
         try:
@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from . import jsoncodec
+from .exceptions import InvalidArgumentException
+from .instastorysavercontext import InstaloaderContext
+from .structures import Hashtag, JsonExportable, Post, Profile, StoryItem, get_json_structure, load_structure
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS structures (
+    node_type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    data BLOB NOT NULL,
+    PRIMARY KEY (node_type, id)
+);
+CREATE INDEX IF NOT EXISTS structures_id ON structures (id);
+CREATE INDEX IF NOT EXISTS structures_name ON structures (name);
+"""
+
+
+class ArchiveRecord(NamedTuple):
+    """Serialized structure, as returned by :meth:`MetadataArchive.encode`.
+
+    .. versionadded:: 4.15"""
+    node_type: str
+    id: str
+    name: Optional[str]
+    json: str
+
+
+ArchiveRecord.node_type.__doc__ = "Class name of the structure, e.g. 'Post'."
+ArchiveRecord.id.__doc__ = "Media ID of a post or story item, ID of a profile, or name of a hashtag."
+ArchiveRecord.name.__doc__ = "Shortcode of a post or story item, username of a profile, or name of a hashtag."
+ArchiveRecord.json.__doc__ = "Instaloader JSON structure, see :func:`get_json_structure`."
+
+
+def _record_key(structure: JsonExportable) -> Tuple[str, Optional[str]]:
+    if isinstance(structure, (Post, StoryItem)):
+        return str(structure.mediaid), structure.shortcode
+    if isinstance(structure, Profile):
+        return str(structure.userid), structure.username
+    if isinstance(structure, Hashtag):
+        return structure.name, structure.name
+    raise InvalidArgumentException("{} cannot be stored in a metadata archive.".format(structure.__class__.__name__))
+
+
+class MetadataArchive:
+    """Stores the metadata JSON of many posts, story items, profiles and hashtags in one SQLite database, instead of
+    one '.json.xz' file each, which keeps large archives at a few files and fast to list.
+
+    Each structure is stored once, indexed by its ID and by its shortcode, username or name; saving it again replaces
+    the record. Records are compressed individually and are read back with :meth:`load`::
+
+       with MetadataArchive('instagram/metadata.sqlite') as archive:
+           archive.save(post)
+           post = archive.load(L.context, post.shortcode)
+
+    An archive may be used from several threads.
+
+    :param filename: Database file, created if it does not exist.
+    :param compression: 'xz', 'gzip' or None to store the records uncompressed.
+    :param compression_level: LZMA preset or gzip level (0-9); lower is faster. None for the library default.
+    :param read_only: Open an existing archive only for loading, without schema creation or writes. As archives are
+       in WAL mode, SQLite still creates the '-wal' and '-shm' files next to the archive while it is open, unless
+       the directory is not writable, in which case the archive is opened as immutable, assuming that no writer can
+       be active either.
+
+    .. versionadded:: 4.15"""
+
+    FILENAME = 'metadata.sqlite'
+    """Filename of the archive within a target directory, used by :class:`Instaloader` with `metadata_archive`."""
+
+    def __init__(self, filename: str, compression: Optional[str] = 'xz', compression_level: Optional[int] = None,
+                 read_only: bool = False):
+        if compression is not None and compression not in jsoncodec.COMPRESSIONS:
+            raise InvalidArgumentException("JSON compression must be one of {}."
+                                           .format(', '.join(jsoncodec.COMPRESSIONS)))
+        self.filename = filename
+        self.compression = compression
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        if read_only:
+            path = Path(filename).absolute()
+            uri = path.as_uri() + '?mode=ro'
+            if not os.access(path.parent, os.W_OK):
+                # The WAL index cannot be created in a read-only directory
+                uri += '&immutable=1'
+            self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        with self._lock:
+            # WAL lets an archive be read while another connection writes to it
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def encode(structure: JsonExportable, metadata_profile: str = 'full') -> ArchiveRecord:
+        """Serialize a structure for :meth:`write`. Done separately, as the structure may change afterwards.
+
+        :param metadata_profile: Fields to include, see :func:`get_json_structure`.
+        :raises InvalidArgumentException: If the structure cannot be stored in an archive."""
+        structure_id, name = _record_key(structure)
+        return ArchiveRecord(structure.__class__.__name__, structure_id, name,
+                             jsoncodec.dumps(get_json_structure(structure, metadata_profile)))
+
+    def write(self, record: ArchiveRecord) -> None:
+        """Compress and store a record returned by :meth:`encode`, replacing a previous one of the structure."""
+        data = jsoncodec.compress(record.json, self.compression, self.compression_level)
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO structures (node_type, id, name, data) "
+                                     "VALUES (?, ?, ?, ?)", (record.node_type, record.id, record.name, data))
+
+    def save(self, structure: JsonExportable, metadata_profile: str = 'full') -> None:
+        """Store a :class:`Post`, :class:`StoryItem`, :class:`Profile` or :class:`Hashtag`.
+
+        :param metadata_profile: Fields to include, see :func:`get_json_structure`.
+        :raises InvalidArgumentException: If the structure cannot be stored in an archive."""
+        self.write(self.encode(structure, metadata_profile))
+
+    def keys(self, node_types: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+        """(node type, ID) of all stored structures, in the order they have been saved.
+
+        :param node_types: Class names of the structures to list, e.g. ``('Post', 'StoryItem')``; None for all."""
+        query = "SELECT node_type, id FROM structures"
+        parameters: Sequence[str] = ()
+        if node_types is not None:
+            query += " WHERE node_type IN ({})".format(', '.join('?' * len(node_types)))
+            parameters = tuple(node_types)
+        with self._lock:
+            return self._connection.execute(query + " ORDER BY rowid", parameters).fetchall()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM structures").fetchone()[0]
+
+    def __contains__(self, key: Union[str, int]) -> bool:
+        return self._find(key) is not None
+
+    def _find(self, key: Union[str, int], node_type: Optional[str] = None) -> Optional[bytes]:
+        query = "SELECT data FROM structures WHERE (id = ? OR name = ?)"
+        parameters: Tuple[str, ...] = (str(key), str(key))
+        if node_type is not None:
+            query += " AND node_type = ?"
+            parameters += (node_type,)
+        # A structure with this ID takes precedence over one with this name, e.g. a profile whose username is the
+        # media ID of a post
+        with self._lock:
+            row = self._connection.execute(query + " ORDER BY id = ? DESC, rowid DESC LIMIT 1",
+                                           parameters + (str(key),)).fetchone()
+        return row[0] if row is not None else None
+
+    def load(self, context: InstaloaderContext, key: Union[str, int],
+             node_type: Optional[str] = None) -> JsonExportable:
+        """Load a stored structure.
+
+        :param context: :attr:`Instaloader.context` linked to the new object, used for additional queries if
+           necessary.
+        :param key: Media ID or shortcode of a post or story item, ID or username of a profile, or name of a hashtag.
+           If both a structure with this ID and one with this name are stored, the one with this ID is loaded.
+        :param node_type: Class name of the structure, if key may be ambiguous.
+        :raises KeyError: If no such structure is stored."""
+        data = self._find(key, node_type)
+        if data is None:
+            raise KeyError(key)
+        return load_structure(context, jsoncodec.decompress(data))
+
+    def structures(self, context: InstaloaderContext,
+                   node_types: Optional[Sequence[str]] = None) -> Iterator[JsonExportable]:
+        """Load all stored structures, in the order they have been saved.
+
+        :param node_types: Class names of the structures to load, e.g. ``('Post', 'StoryItem')``; None for all."""
+        for node_type, structure_id in self.keys(node_types):
+            with self._lock:
+                row = self._connection.execute("SELECT data FROM structures WHERE node_type = ? AND id = ?",
+                                               (node_type, structure_id)).fetchone()
+            if row is not None:
+                yield load_structure(context, jsoncodec.decompress(row[0]))
+
+
+def load_structure_from_archive(context: InstaloaderContext, filename: str, key: Union[str, int]) -> JsonExportable:
+    """Loads a :class:`Post`, :class:`Profile`, :class:`StoryItem` or :class:`Hashtag` from a :class:`MetadataArchive`.
+
+    :param context: :attr:`Instaloader.context` linked to the new object, used for additional queries if necessary.
+    :param filename: Archive filename, usually ending in 'metadata.sqlite'
+    :param key: Media ID or shortcode of a post or story item, ID or username of a profile, or name of a hashtag.
+    :raises KeyError: If no such structure is stored.
+
+    .. versionadded:: 4.15
+    """
+    if not os.path.isfile(filename):
+        raise FileNotFoundError(filename)
+    with MetadataArchive(filename, read_only=True) as archive:
+        return archive.load(context, key)
@@ -5,7 +5,7 @@ import os
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from lzma import LZMAError
-from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, TypeVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
 
 from .exceptions import AbortDownloadException, InvalidArgumentException
 from .instastorysavercontext import InstaloaderContext
@@ -69,6 +69,10 @@ class NodeIterator(Iterator[T]):
 
     .. versionchanged: 4.13
        Included support for `doc_id`-based queries (using POST method).
+
+    .. versionchanged: 4.15
+       ``page_prefetch`` is called with the remaining nodes of each page before the first of them is wrapped, e.g. to
+       resolve additional data for a whole page at once.
     """
 
     _graphql_page_length = 12
@@ -83,7 +87,8 @@ class NodeIterator(Iterator[T]):
                  query_referer: Optional[str] = None,
                  first_data: Optional[Dict[str, Any]] = None,
                  is_first: Optional[Callable[[T, Optional[T]], bool]] = None,
-                 doc_id: Optional[str] = None):
+                 doc_id: Optional[str] = None,
+                 page_prefetch: Optional[Callable[[List[Dict]], None]] = None):
         self._context = context
         self._query_hash = query_hash
         self._doc_id = doc_id
@@ -100,6 +105,8 @@ class NodeIterator(Iterator[T]):
             self._data = self._query()
         self._first_node: Optional[Dict] = None
         self._is_first = is_first
+        self._page_prefetch = page_prefetch
+        self._prefetched_data: Optional[Dict] = None
 
     def _query(self, after: Optional[str] = None) -> Dict:
         if self._doc_id is not None:
@@ -140,6 +147,9 @@ class NodeIterator(Iterator[T]):
 
     def __next__(self) -> T:
         if self._page_index < len(self._data['edges']):
+            if self._page_prefetch is not None and self._prefetched_data is not self._data:
+                self._prefetched_data = self._data
+                self._page_prefetch([edge['node'] for edge in self._data['edges'][self._page_index:]])
             node = self._data['edges'][self._page_index]['node']
             page_index, total_index = self._page_index, self._total_index
             try:
@@ -0,0 +1,88 @@
+import heapq
+from datetime import datetime
+from enum import IntEnum
+from itertools import count
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+
+class CapturePriority(IntEnum):
+    """Classes of work scheduled by :class:`CaptureScheduler`, most urgent first.
+
+    .. versionadded:: 4.15"""
+    STORY = 0
+    HIGHLIGHT = 1
+    POST = 2
+
+
+class CaptureTask(NamedTuple):
+    """Unit of work scheduled by :class:`CaptureScheduler`.
+
+    .. versionadded:: 4.15"""
+    priority: CapturePriority
+    deadline: Optional[datetime]
+    label: str
+    action: Callable[[], object]
+
+
+CaptureTask.priority.__doc__ = "The :class:`CapturePriority` of the task."
+CaptureTask.deadline.__doc__ = "Time (UTC) after which the content is gone, e.g. :attr:`StoryItem.expiring_utc`."
+CaptureTask.label.__doc__ = "Description used for logging and error messages."
+CaptureTask.action.__doc__ = "Function doing the work."
+
+
+class CaptureScheduler:
+    """Orders download work by deadline, so that content which is about to disappear is captured first.
+
+    Tasks are run by priority (stories, then highlights, then posts), and within a priority by ascending deadline,
+    tasks without deadline last. Tasks with equal keys run in insertion order::
+
+       scheduler = CaptureScheduler()
+       for post in profile.get_posts():
+           scheduler.add(CapturePriority.POST, partial(L.download_post, post, profile.username))
+       for item in story.get_items():
+           scheduler.add(CapturePriority.STORY, partial(L.download_storyitem, item, ':stories'),
+                         deadline=item.expiring_utc)
+       scheduler.run(L.context.error_catcher)
+
+    Tasks may be added while iterating.
+
+    .. versionadded:: 4.15"""
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[int, float, int, CaptureTask]] = []
+        self._sequence = count()
+
+    def add(self, priority: CapturePriority, action: Callable[[], object],
+            deadline: Optional[datetime] = None, label: str = '') -> None:
+        """Schedule action.
+
+        :param priority: Class of the work.
+        :param action: Function doing the work.
+        :param deadline: Time (UTC) when the content expires, or None.
+        :param label: Description used for logging and error messages."""
+        key = (deadline - datetime(1970, 1, 1)).total_seconds() if deadline is not None else float('inf')
+        heapq.heappush(self._heap, (priority, key, next(self._sequence),
+                                    CaptureTask(priority, deadline, label, action)))
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> CaptureTask:
+        if not self._heap:
+            raise StopIteration()
+        return heapq.heappop(self._heap)[3]
+
+    def run(self, error_handler: Optional[Callable[[str], object]] = None) -> None:
+        """Run all scheduled tasks in order.
+
+        :param error_handler: Context manager factory such as :meth:`InstaloaderContext.error_catcher`, which is
+           called with the task's label and wraps the task's action."""
+        for task in self:
+            if error_handler is None:
+                task.action()
+            else:
+                with error_handler(task.label):  # type: ignore
+                    task.action()
@@ -1,15 +1,15 @@
-import json
-import lzma
 import re
+import threading
 from base64 import b64decode, b64encode
 from contextlib import suppress
 from datetime import datetime
 from itertools import islice
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
 from unicodedata import normalize
 
 from . import __version__
+from . import jsoncodec
 from .exceptions import *
 from .instastorysavercontext import InstaloaderContext
 from .nodeiterator import FrozenNodeIterator, NodeIterator
@@ -20,7 +20,7 @@ class PostSidecarNode(NamedTuple):
     """Item of a Sidecar Post."""
     is_video: bool
     display_url: str
-    video_url: str
+    video_url: Optional[str]
 
 
 PostSidecarNode.is_video.__doc__ = "Whether this node is a video."
@@ -108,6 +108,25 @@ class PostComment:
         """ Iterator which yields all :class:`PostCommentAnswer` for the comment. """
         return self._answers
 
+    @property
+    def answers_count(self) -> Optional[int]:
+        """
+        Number of answers to the comment, as reported along with it, or None if unknown.
+
+        .. versionadded:: 4.15
+        """
+        if "iphone_struct" in self._node:
+            return self._node["iphone_struct"].get("child_comment_count")
+        return self._node.get('edge_threaded_comments', {}).get('count')
+
+    def without_answers(self) -> 'PostComment':
+        """
+        Copy of the comment whose :attr:`answers` are empty, e.g. as they are known already and need not be fetched.
+
+        .. versionadded:: 4.15
+        """
+        return PostComment(context=self._context, node=self._node, answers=iter(()), post=self._post)
+
     @property
     def likes(self) -> Iterable['Profile']:
         """
@@ -145,6 +164,28 @@ PostLocation.has_public_page.__doc__ = "Whether location has a public page."
 PostLocation.lat.__doc__ = "Latitude (:class:`float` or None)."
 PostLocation.lng.__doc__ = "Longitude (:class:`float` or None)."
 
+class ImageResolution(NamedTuple):
+    """Policy for choosing among the renditions of an image, see :option:`--image-resolution`.
+
+    .. versionadded:: 4.15"""
+    mode: str
+    width: int
+
+    @classmethod
+    def from_string(cls, spec: str) -> 'ImageResolution':
+        """Parse ``max:WIDTH``, ``exact:WIDTH`` or ``min:WIDTH``.
+
+        :raises InvalidArgumentException: If spec is malformed."""
+        mode, _, width = spec.partition(':')
+        if mode not in ('max', 'exact', 'min') or not width.isdigit():
+            raise InvalidArgumentException("Invalid image resolution \"{}\", expected max:WIDTH, exact:WIDTH "
+                                           "or min:WIDTH.".format(spec))
+        return cls(mode, int(width))
+
+
+ImageResolution.mode.__doc__ = "``max`` (largest not wider), ``exact`` (nearest) or ``min`` (smallest not narrower)."
+ImageResolution.width.__doc__ = "Width in pixels."
+
 # This regular expression is by MiguelX413
 _hashtag_regex = re.compile(r"(?:#)((?:\w){1,150})")
 
@@ -162,6 +203,106 @@ def _optional_normalize(string: Optional[str]) -> Optional[str]:
         return None
 
 
+def _select_image_url(context: InstaloaderContext, candidates: List[Dict[str, Any]]) -> str:
+    """Choose among candidates (dicts with ``url`` and ``width``, largest first) according to
+    :attr:`InstaloaderContext.image_resolution`."""
+    policy = context.image_resolution
+    if policy is None or len(candidates) == 1:
+        return candidates[0]['url']
+    mode, width = policy
+    by_width = sorted(candidates, key=lambda candidate: candidate['width'])
+    if mode == 'max':
+        fitting = [candidate for candidate in by_width if candidate['width'] <= width]
+        return (fitting[-1] if fitting else by_width[0])['url']
+    if mode == 'min':
+        fitting = [candidate for candidate in by_width if candidate['width'] >= width]
+        return (fitting[0] if fitting else by_width[-1])['url']
+    return min(by_width, key=lambda candidate: (abs(candidate['width'] - width), -candidate['width']))['url']
+
+
+class _IphoneStructPage:  # pylint:disable=too-few-public-methods
+    """iPhone structs of the posts of one page of a GraphQL post iterator, fetched on demand.
+
+    When a post of the page first needs its iPhone struct, the structs of that post and of the following posts of the
+    page are obtained with a single ``media/infos`` request. Pages whose posts are all skipped, e.g. by a filter or by
+    fast-update, cost no request. The structs are kept here rather than in the page's nodes, so that they do not end up
+    in a :class:`FrozenNodeIterator`."""
+
+    def __init__(self, context: InstaloaderContext, nodes: List[Dict[str, Any]]):
+        self._context = context
+        self._pending = [str(node['id']) for node in nodes if 'id' in node and 'iphone_struct' not in node]
+        self._structs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def pop(self, mediaid: int) -> Optional[Dict[str, Any]]:
+        """The iPhone struct of a post of the page, or None if it could not be obtained with the page."""
+        key = str(mediaid)
+        with self._lock:
+            if key in self._pending:
+                index = self._pending.index(key)
+                batch, self._pending = self._pending[index:], self._pending[:index]
+                try:
+                    data = self._context.get_iphone_json('api/v1/media/infos/', params={'media_ids': ','.join(batch)})
+                except InstaloaderException as err:
+                    self._context.error(f"Unable to fetch iPhone media info of {len(batch)} posts at once: {err}",
+                                        repeat_at_end=False)
+                    return None
+                for item in data.get('items', []):
+                    if str(item.get('pk')) in batch:
+                        self._structs[str(item['pk'])] = item
+            return self._structs.pop(key, None)
+
+
+def _lazy_iphone_structs(context: InstaloaderContext, node_wrapper: Callable[[Dict[str, Any]], 'Post']) \
+        -> Tuple[Callable[[Dict[str, Any]], 'Post'], Callable[[List[Dict[str, Any]]], None]]:
+    """Node wrapper and ``page_prefetch`` hook for a :class:`NodeIterator` of posts, which let the posts obtain their
+    iPhone structs page-wise, see :class:`_IphoneStructPage`."""
+    current_page: List[Optional[_IphoneStructPage]] = [None]
+
+    def page_prefetch(nodes: List[Dict[str, Any]]) -> None:
+        if context.iphone_support and context.is_logged_in:
+            current_page[0] = _IphoneStructPage(context, nodes)
+
+    def wrap(node: Dict[str, Any]) -> 'Post':
+        # pylint:disable=protected-access
+        post = node_wrapper(node)
+        post._iphone_struct_page = current_page[0]
+        return post
+
+    return wrap, page_prefetch
+
+
+def _video_version_quality(version: Dict[str, Any]) -> Tuple[int, int]:
+    return version['width'] * version['height'], version.get('bandwidth') or 0
+
+
+def _select_video_url(context: InstaloaderContext, graphql_url: Optional[str],
+                      video_versions: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    """Choose the best video URL, preferring the dimensions given in the iPhone struct over HEAD requests.
+
+    Versions higher than :attr:`InstaloaderContext.max_video_height` are skipped unless no version fits."""
+    sized = [version for version in video_versions or []
+             if version.get('url') and version.get('width') and version.get('height')]
+    if sized:
+        max_height = context.max_video_height
+        fitting = [version for version in sized if max_height is None or version['height'] <= max_height]
+        if not fitting:
+            return min(sized, key=_video_version_quality)['url']
+        return max(fitting, key=_video_version_quality)['url']
+    version_urls = [graphql_url] if graphql_url else []
+    version_urls.extend(version['url'] for version in video_versions or [] if version.get('url'))
+    version_urls = list(dict.fromkeys(version_urls))
+    if len(version_urls) == 0:
+        return None
+    if len(version_urls) == 1:
+        return version_urls[0]
+    content_lengths = context.content_lengths(version_urls)
+    if not content_lengths:
+        # All candidates fail: Fallback to default URL and handle errors later at the actual download attempt
+        return version_urls[0]
+    return max(content_lengths, key=lambda url: (content_lengths[url], url))
+
+
 class Post:
     """
     Structure containing information about an Instagram post.
@@ -198,6 +339,9 @@ class Post:
         if 'iphone_struct' in node:
             # if loaded from JSON with load_structure_from_file()
             self._iphone_struct_ = node['iphone_struct']
+        # Set by post iterators which obtain the iPhone structs of a page at once
+        self._iphone_struct_page: Optional[_IphoneStructPage] = None
+        self._sidecar_nodes_: Optional[List[PostSidecarNode]] = None
 
     @classmethod
     def from_shortcode(cls, context: InstaloaderContext, shortcode: str):
@@ -352,6 +496,9 @@ class Post:
             raise IPhoneSupportDisabledException("iPhone support is disabled.")
         if not self._context.is_logged_in:
             raise LoginRequiredException("Login required to access iPhone media info endpoint.")
+        if not self._iphone_struct_ and self._iphone_struct_page is not None:
+            self._iphone_struct_ = self._iphone_struct_page.pop(self.mediaid)
+            self._iphone_struct_page = None
         if not self._iphone_struct_:
             data = self._context.get_iphone_json(path='api/v1/media/{}/info/'.format(self.mediaid), params={})
             self._iphone_struct_ = data['items'][0]
@@ -426,14 +573,20 @@ class Post:
 
     @property
     def url(self) -> str:
-        """URL of the picture / video thumbnail of the post"""
+        """URL of the picture / video thumbnail of the post
+
+        .. versionchanged:: 4.15
+           Rendition chosen according to :option:`--image-resolution`."""
         if self.typename == "GraphImage" and self._context.iphone_support and self._context.is_logged_in:
             try:
-                orig_url = self._iphone_struct['image_versions2']['candidates'][0]['url']
+                orig_url = _select_image_url(self._context, self._iphone_struct['image_versions2']['candidates'])
                 url = re.sub(r'([?&])se=\d+&?', r'\1', orig_url).rstrip('&')
                 return url
             except (InstaloaderException, KeyError, IndexError) as err:
                 self._context.error(f"Unable to fetch high quality image version of {self}: {err}")
+        if self._context.image_resolution is not None and self._node.get("display_resources"):
+            return _select_image_url(self._context, [{'url': resource['src'], 'width': resource.get('config_width', 0)}
+                                                     for resource in reversed(self._node["display_resources"])])
         return self._node["display_url"] if "display_url" in self._node else self._node["display_src"]
 
     @property
@@ -449,6 +602,8 @@ class Post:
         .. versionadded:: 4.6
         """
         if self.typename == 'GraphSidecar':
+            if self._sidecar_nodes_ is not None:
+                return len(self._sidecar_nodes_)
             edges = self._field('edge_sidecar_to_children', 'edges')
             return len(edges)
         return 1
@@ -466,40 +621,70 @@ class Post:
         .. versionadded:: 4.7
         """
         if self.typename == 'GraphSidecar':
+            if self._sidecar_nodes_ is not None:
+                return [node.is_video for node in self._sidecar_nodes_]
             edges = self._field('edge_sidecar_to_children', 'edges')
             return [edge['node']['is_video'] for edge in edges]
         return [self.is_video]
 
+    def _iphone_sidecar_nodes(self) -> Optional[List[PostSidecarNode]]:
+        if not self._context.iphone_support or not self._context.is_logged_in:
+            return None
+        try:
+            nodes = []
+            for media in self._iphone_struct['carousel_media']:
+                orig_url = _select_image_url(self._context, media['image_versions2']['candidates'])
+                display_url = re.sub(r'([?&])se=\d+&?', r'\1', orig_url).rstrip('&')
+                video_versions = media.get('video_versions')
+                video_url = _select_video_url(self._context, None, video_versions) if video_versions else None
+                nodes.append(PostSidecarNode(is_video=media.get('media_type') == 2 or video_url is not None,
+                                             display_url=display_url, video_url=video_url))
+            return nodes
+        except (InstaloaderException, KeyError, IndexError, TypeError) as err:
+            self._context.error(f"Unable to fetch high quality image version of {self}: {err}")
+            return None
+
+    def _resolve_sidecar_nodes(self, start: int, end: int) -> List[PostSidecarNode]:
+        """Sidecar nodes, preferring the iPhone struct, which has high quality images and videos of all slides at
+        once. Otherwise, the full metadata is only queried if a video URL of a chosen slide is missing.
+
+        The result is memoized if it is complete."""
+        if self._sidecar_nodes_ is not None:
+            return self._sidecar_nodes_
+        nodes = self._iphone_sidecar_nodes()
+        if nodes is not None and not any(node.is_video and node.video_url is None for node in nodes):
+            self._sidecar_nodes_ = nodes
+            return nodes
+        # Fall back to the GraphQL nodes if the iPhone struct is unavailable or lacks a video URL
+        edges = self._field('edge_sidecar_to_children', 'edges')
+        if any(edge['node']['is_video'] and 'video_url' not in edge['node'] for edge in edges[start:(end+1)]):
+            # video_url is only present in full metadata, issue #558.
+            edges = self._full_metadata['edge_sidecar_to_children']['edges']
+        nodes = [PostSidecarNode(is_video=edge['node']['is_video'], display_url=edge['node']['display_url'],
+                                 video_url=edge['node'].get('video_url') if edge['node']['is_video'] else None)
+                 for edge in edges]
+        if not any(node.is_video and node.video_url is None for node in nodes):
+            self._sidecar_nodes_ = nodes
+        return nodes
+
     def get_sidecar_nodes(self, start=0, end=-1) -> Iterator[PostSidecarNode]:
         """
         Sidecar nodes of a Post with typename==GraphSidecar.
 
         .. versionchanged:: 4.6
            Added parameters *start* and *end* to specify a slice of sidecar media.
+
+        .. versionchanged:: 4.15
+           Resolved at most once per Post, with a single request if logged in.
         """
         if self.typename == 'GraphSidecar':
-            edges = self._field('edge_sidecar_to_children', 'edges')
+            count = self.mediacount
             if end < 0:
-                end = len(edges)-1
+                end = count-1
             if start < 0:
-                start = len(edges)-1
-            if any(edge['node']['is_video'] and 'video_url' not in edge['node'] for edge in edges[start:(end+1)]):
-                # video_url is only present in full metadata, issue #558.
-                edges = self._full_metadata['edge_sidecar_to_children']['edges']
-            for idx, edge in enumerate(edges):
-                if start <= idx <= end:
-                    node = edge['node']
-                    is_video = node['is_video']
-                    display_url = node['display_url']
-                    if not is_video and self._context.iphone_support and self._context.is_logged_in:
-                        try:
-                            carousel_media = self._iphone_struct['carousel_media']
-                            orig_url = carousel_media[idx]['image_versions2']['candidates'][0]['url']
-                            display_url = re.sub(r'([?&])se=\d+&?', r'\1', orig_url).rstrip('&')
-                        except (InstaloaderException, KeyError, IndexError) as err:
-                            self._context.error(f"Unable to fetch high quality image version of {self}: {err}")
-                    yield PostSidecarNode(is_video=is_video, display_url=display_url,
-                                          video_url=node['video_url'] if is_video else None)
+                start = count-1
+            nodes = self._resolve_sidecar_nodes(start, end)
+            yield from nodes[start:(end+1)]
 
     @property
     def caption(self) -> Optional[str]:
@@ -560,37 +745,23 @@ class Post:
 
     @property
     def video_url(self) -> Optional[str]:
-        """URL of the video, or None."""
+        """URL of the video, or None.
+
+        .. versionchanged:: 4.15
+           Chosen by the dimensions of the available versions, capped by :option:`--max-video-height`."""
         if self.is_video:
-            version_urls = []
+            graphql_url = None
             try:
-                version_urls.append(self._field('video_url'))
+                graphql_url = self._field('video_url')
             except (InstaloaderException, KeyError, IndexError) as err:
                 self._context.error(f"Warning: Unable to fetch video from graphql of {self}: {err}")
+            video_versions = None
             if self._context.iphone_support and self._context.is_logged_in:
                 try:
-                    version_urls.extend(version['url'] for version in self._iphone_struct['video_versions'])
+                    video_versions = self._iphone_struct['video_versions']
                 except (InstaloaderException, KeyError, IndexError) as err:
                     self._context.error(f"Unable to fetch high-quality video version of {self}: {err}")
-            version_urls = list(dict.fromkeys(version_urls))
-            if len(version_urls) == 0:
-                return None
-            if len(version_urls) == 1:
-                return version_urls[0]
-            url_candidates: List[Tuple[int, str]] = []
-            for idx, version_url in enumerate(version_urls):
-                try:
-                    url_candidates.append((
-                        int(self._context.head(version_url, allow_redirects=True).headers.get('Content-Length', 0)),
-                        version_url
-                    ))
-                except (InstaloaderException, KeyError, IndexError) as err:
-                    self._context.error(f"Video URL candidate {idx+1}/{len(version_urls)} for {self}: {err}")
-            if not url_candidates:
-                # All candidates fail: Fallback to default URL and handle errors later at the actual download attempt
-                return version_urls[0]
-            url_candidates.sort()
-            return url_candidates[-1][1]
+            return _select_video_url(self._context, graphql_url, video_versions)
         return None
 
     @property
@@ -769,6 +940,47 @@ class Post:
             'https://www.instagram.com/p/{0}/'.format(self.shortcode),
         )
 
+    def get_new_comments(self, known_answers: Optional[Mapping[int, int]] = None,
+                         known_until: Optional[datetime] = None,
+                         comments: Optional[Iterable[PostComment]] = None) -> Iterator[PostComment]:
+        """Iterate over the comments of the post for refreshing already stored comments.
+
+        Like :meth:`get_comments`, but iteration stops after a full page of known comments, once all comments of the
+        post are known. Known comments are still yielded, with current text and likes count, but their answers are
+        only fetched if their number differs from the known one, so that a refresh costs requests for new comments
+        only.
+
+        :param known_answers: Number of known answers by ID of each known comment.
+        :param known_until: Creation time (UTC) of the newest known comment; comments not newer are considered known.
+        :param comments: Iterable returned by :meth:`get_comments` to take the comments from, e.g. to resume it with
+           :func:`resumable_iteration`; by default obtained from :meth:`get_comments`.
+
+        .. versionadded:: 4.15
+        """
+        if comments is None:
+            comments = self.get_comments()
+        known_answers = known_answers or {}
+        # Comments and answers known so far, counting the new ones that have been yielded
+        known_count = len(known_answers) + sum(known_answers.values())
+        known_in_row = 0
+        for comment in comments:
+            answers_count = comment.answers_count or 0
+            if comment.id in known_answers or (known_until is not None and comment.created_at_utc <= known_until):
+                known_in_row += 1
+                if comment.id in known_answers:
+                    if known_answers[comment.id] == comment.answers_count:
+                        comment = comment.without_answers()
+                    else:
+                        known_count += max(0, answers_count - known_answers[comment.id])
+            else:
+                known_in_row = 0
+                known_count += 1 + answers_count
+            yield comment
+            # Without knowing all comments, known ones might be followed by new ones
+            complete = known_count >= self.comments if known_answers else True
+            if complete and known_in_row >= NodeIterator.page_length():
+                return
+
     def get_likes(self) -> Iterator['Profile']:
         """
         Iterate over all likes of the post. A :class:`Profile` instance of each likee is yielded.
@@ -914,8 +1126,9 @@ class Profile:
         :param profile_id: userid
         :raises: :class:`ProfileNotExistsException`
         """
-        if profile_id in context.profile_id_cache:
-            return context.profile_id_cache[profile_id]
+        cached_profile = context.profile_id_cache.get(profile_id)
+        if cached_profile is not None:
+            return cached_profile
         data = context.graphql_query('7c16654f22c819fb63d1183034a5162f',
                                      {'user_id': str(profile_id),
                                       'include_chaining': False,
@@ -1219,13 +1432,15 @@ class Profile:
         if self.username != self._context.username:
             raise LoginRequiredException(f"Login as {self.username} required to get that profile's saved posts.")
 
+        node_wrapper, page_prefetch = _lazy_iphone_structs(self._context, lambda n: Post(self._context, n))
         return NodeIterator(
             self._context,
             'f883d95537fbcd400f466f63d42bd8a1',
             lambda d: d['data']['user']['edge_saved_media'],
-            lambda n: Post(self._context, n),
+            node_wrapper,
             {'id': self.userid},
             'https://www.instagram.com/{0}/'.format(self.username),
+            page_prefetch=page_prefetch,
         )
 
     def get_tagged_posts(self) -> NodeIterator[Post]:
@@ -1235,14 +1450,17 @@ class Profile:
 
         .. versionadded:: 4.0.7"""
         self._obtain_metadata()
+        node_wrapper, page_prefetch = _lazy_iphone_structs(
+            self._context, lambda n: Post(self._context, n, self if int(n['owner']['id']) == self.userid else None))
         return NodeIterator(
             self._context,
             'e31a871f7301132ceaab56507a66bbb7',
             lambda d: d['data']['user']['edge_user_to_photos_of_you'],
-            lambda n: Post(self._context, n, self if int(n['owner']['id']) == self.userid else None),
+            node_wrapper,
             {'id': self.userid},
             'https://www.instagram.com/{0}/'.format(self.username),
-            is_first=Profile._make_is_newest_checker()
+            is_first=Profile._make_is_newest_checker(),
+            page_prefetch=page_prefetch,
         )
 
     def get_reels(self) -> NodeIterator[Post]:
@@ -1276,15 +1494,17 @@ class Profile:
 
         .. versionadded:: 4.3"""
         self._obtain_metadata()
+        node_wrapper, page_prefetch = _lazy_iphone_structs(self._context, lambda n: Post(self._context, n, self))
         return NodeIterator(
             self._context,
             'bc78b344a68ed16dd5d7f264681c4c76',
             lambda d: d['data']['user']['edge_felix_video_timeline'],
-            lambda n: Post(self._context, n, self),
+            node_wrapper,
             {'id': self.userid},
             'https://www.instagram.com/{0}/channel/'.format(self.username),
             self._metadata('edge_felix_video_timeline'),
-            Profile._make_is_newest_checker()
+            Profile._make_is_newest_checker(),
+            page_prefetch=page_prefetch,
         )
 
     @staticmethod
@@ -1502,16 +1722,20 @@ class StoryItem:
 
     @property
     def url(self) -> str:
-        """URL of the picture / video thumbnail of the StoryItem"""
+        """URL of the picture / video thumbnail of the StoryItem
+
+        .. versionchanged:: 4.15
+           Rendition chosen according to :option:`--image-resolution`."""
         if self.typename in ["GraphStoryImage", "StoryImage"] and \
                 self._context.iphone_support and self._context.is_logged_in:
             try:
-                orig_url = self._iphone_struct['image_versions2']['candidates'][0]['url']
+                orig_url = _select_image_url(self._context, self._iphone_struct['image_versions2']['candidates'])
                 url = re.sub(r'([?&])se=\d+&?', r'\1', orig_url).rstrip('&')
                 return url
             except (InstaloaderException, KeyError, IndexError) as err:
                 self._context.error(f"Unable to fetch high quality image version of {self}: {err}")
-        return self._node['display_resources'][-1]['src']
+        return _select_image_url(self._context, [{'url': resource['src'], 'width': resource.get('config_width', 0)}
+                                                 for resource in reversed(self._node['display_resources'])])
 
     @property
     def typename(self) -> str:
@@ -1572,37 +1796,23 @@ class StoryItem:
 
     @property
     def video_url(self) -> Optional[str]:
-        """URL of the video, or None."""
+        """URL of the video, or None.
+
+        .. versionchanged:: 4.15
+           Chosen by the dimensions of the available versions, capped by :option:`--max-video-height`."""
         if self.is_video:
-            version_urls = []
+            graphql_url = None
             try:
-                version_urls.append(self._node['video_resources'][-1]['src'])
+                graphql_url = self._node['video_resources'][-1]['src']
             except (InstaloaderException, KeyError, IndexError) as err:
                 self._context.error(f"Warning: Unable to fetch video from graphql of {self}: {err}")
+            video_versions = None
             if self._context.iphone_support and self._context.is_logged_in:
                 try:
-                    version_urls.extend(version['url'] for version in self._iphone_struct['video_versions'])
+                    video_versions = self._iphone_struct['video_versions']
                 except (InstaloaderException, KeyError, IndexError) as err:
                     self._context.error(f"Unable to fetch high-quality video version of {self}: {err}")
-            version_urls = list(dict.fromkeys(version_urls))
-            if len(version_urls) == 0:
-                return None
-            if len(version_urls) == 1:
-                return version_urls[0]
-            url_candidates: List[Tuple[int, str]] = []
-            for idx, version_url in enumerate(version_urls):
-                try:
-                    url_candidates.append((
-                        int(self._context.head(version_url, allow_redirects=True).headers.get('Content-Length', 0)),
-                        version_url
-                    ))
-                except (InstaloaderException, KeyError, IndexError) as err:
-                    self._context.error(f"Video URL candidate {idx+1}/{len(version_urls)} for {self}: {err}")
-            if not url_candidates:
-                # All candidates fail: Fallback to default URL and handle errors later at the actual download attempt
-                return version_urls[0]
-            url_candidates.sort()
-            return url_candidates[-1][1]
+            return _select_video_url(self._context, graphql_url, video_versions)
         return None
 
 
@@ -1625,14 +1835,20 @@ class Story:
 
     :param context: :class:`InstaloaderContext` instance used for additional queries if necessary.
     :param node: Dictionary containing the available information of the story as returned by Instagram.
+    :param iphone_struct: The story's reel as returned by the iPhone ``feed/reels_media`` endpoint, if already known.
+
+    .. versionchanged:: 4.15
+       Added parameter *iphone_struct*.
     """
 
-    def __init__(self, context: InstaloaderContext, node: Dict[str, Any]):
+    def __init__(self, context: InstaloaderContext, node: Dict[str, Any],
+                 iphone_struct: Optional[Dict[str, Any]] = None):
         self._context = context
         self._node = node
         self._unique_id: Optional[str] = None
         self._owner_profile: Optional[Profile] = None
-        self._iphone_struct_: Optional[Dict[str, Any]] = None
+        self._iphone_struct_: Optional[Dict[str, Any]] = iphone_struct
+        self._iphone_items_: Optional[Dict[int, Dict[str, Any]]] = None
 
     def __repr__(self):
         return '<Story by {} changed {:%Y-%m-%d_%H-%M-%S_UTC}>'.format(self.owner_username, self.latest_media_utc)
@@ -1710,16 +1926,21 @@ class Story:
             )
             self._iphone_struct_ = data['reels'][str(self.owner_id)]
 
+    def _make_storyitem(self, item: Dict[str, Any]) -> StoryItem:
+        # Index the iPhone items by pk once, and attach them to copies of the GraphQL items rather than to the
+        # shared nodes themselves
+        if self._iphone_items_ is None and self._iphone_struct_ is not None:
+            self._iphone_items_ = {iphone_item['pk']: iphone_item for iphone_item in self._iphone_struct_['items']}
+        iphone_item = self._iphone_items_.get(int(item['id'])) if self._iphone_items_ is not None else None
+        if iphone_item is not None:
+            item = {**item, 'iphone_struct': iphone_item}
+        return StoryItem(self._context, item, self.owner_profile)
+
     def get_items(self) -> Iterator[StoryItem]:
         """Retrieve all items from a story."""
         self._fetch_iphone_struct()
         for item in reversed(self._node['items']):
-            if self._iphone_struct_ is not None:
-                for iphone_struct_item in self._iphone_struct_['items']:
-                    if iphone_struct_item['pk'] == int(item['id']):
-                        item['iphone_struct'] = iphone_struct_item
-                        break
-            yield StoryItem(self._context, item, self.owner_profile)
+            yield self._make_storyitem(item)
 
 
 class Highlight(Story):
@@ -1749,7 +1970,6 @@ class Highlight(Story):
         super().__init__(context, node)
         self._owner_profile = owner
         self._items: Optional[List[Dict[str, Any]]] = None
-        self._iphone_struct_: Optional[Dict[str, Any]] = None
 
     def __repr__(self):
         return '<Highlight by {}: {}>'.format(self.owner_username, self.title)
@@ -1781,8 +2001,44 @@ class Highlight(Story):
         """URL of the cropped version of the cover."""
         return self._node['cover_media_cropped_thumbnail']['url']
 
+    @staticmethod
+    def prefetch(context: InstaloaderContext, highlights: List['Highlight'], batch_size: int = 20) -> None:
+        """Fetch the items (and iPhone versions) of several highlights with one query per *batch_size* highlights,
+        instead of one query per highlight on first access.
+
+        Highlights whose batch fails are left alone and fetch their items individually later.
+
+        .. versionadded:: 4.15"""
+        # pylint:disable=protected-access
+        pending = [highlight for highlight in highlights if highlight._items is None]
+        for i in range(0, len(pending), batch_size):
+            batch = {str(highlight.unique_id): highlight for highlight in pending[i:i + batch_size]}
+            try:
+                reels = context.graphql_query("45246d3fe16ccc6577e0bd297a5db1ab",
+                                              {"reel_ids": [], "tag_names": [], "location_ids": [],
+                                               "highlight_reel_ids": list(batch),
+                                               "precomposed_overlay": False})['data']['reels_media']
+                for reel in reels:
+                    highlight = batch.get(str(reel['id']).replace('highlight:', ''))
+                    if highlight is not None:
+                        highlight._items = reel['items']
+            except (InstaloaderException, KeyError, TypeError) as err:
+                context.error("Unable to fetch items of {} highlights at once: {}".format(len(batch), err),
+                              repeat_at_end=False)
+            if context.iphone_support and context.is_logged_in:
+                try:
+                    iphone_reels = context.get_iphone_json('api/v1/feed/reels_media/',
+                                                           {'reel_ids': ['highlight:{}'.format(highlight_id)
+                                                                         for highlight_id in batch]})['reels']
+                    for highlight_id, highlight in batch.items():
+                        highlight._iphone_struct_ = (iphone_reels.get('highlight:{}'.format(highlight_id)) or
+                                                     highlight._iphone_struct_)
+                except (InstaloaderException, KeyError) as err:
+                    context.error("Unable to fetch iPhone version of {} highlights at once: {}".format(len(batch), err),
+                                  repeat_at_end=False)
+
     def _fetch_items(self):
-        if not self._items:
+        if self._items is None:
             self._items = self._context.graphql_query("45246d3fe16ccc6577e0bd297a5db1ab",
                                                       {"reel_ids": [], "tag_names": [], "location_ids": [],
                                                        "highlight_reel_ids": [str(self.unique_id)],
@@ -1802,18 +2058,28 @@ class Highlight(Story):
         assert self._items is not None
         return len(self._items)
 
+    @property
+    def fingerprint(self) -> Optional[Tuple[int, int]]:
+        """Item count and timestamp of the latest item, to tell whether the highlight has changed, without fetching
+        its items.
+
+        Taken from the highlight node if it has ``media_count`` and ``latest_reel_media``, otherwise from the items
+        if they have been fetched already, e.g. by :meth:`prefetch`, and None if neither is available.
+
+        .. versionadded:: 4.15"""
+        if 'media_count' in self._node and 'latest_reel_media' in self._node:
+            return int(self._node['media_count']), int(self._node['latest_reel_media'])
+        if self._items is not None:
+            return len(self._items), max((int(item['taken_at_timestamp']) for item in self._items), default=0)
+        return None
+
     def get_items(self) -> Iterator[StoryItem]:
         """Retrieve all associated highlight items."""
         self._fetch_items()
         self._fetch_iphone_struct()
         assert self._items is not None
         for item in self._items:
-            if self._iphone_struct_ is not None:
-                for iphone_struct_item in self._iphone_struct_['items']:
-                    if iphone_struct_item['pk'] == int(item['id']):
-                        item['iphone_struct'] = iphone_struct_item
-                        break
-            yield StoryItem(self._context, item, self.owner_profile)
+            yield self._make_storyitem(item)
 
 
 class Hashtag:
@@ -2013,12 +2279,14 @@ class Hashtag:
         :rtype: NodeIterator[Post]
 
         .. versionadded:: 4.9"""
+        node_wrapper, page_prefetch = _lazy_iphone_structs(self._context, lambda n: Post(self._context, n))
         return NodeIterator(
             self._context, "9b498c08113f1e09617a1703c22b2f32",
             lambda d: d['data']['hashtag']['edge_hashtag_to_media'],
-            lambda n: Post(self._context, n),
+            node_wrapper,
             {'tag_name': self.name},
-            f"https://www.instagram.com/explore/tags/{self.name}/"
+            f"https://www.instagram.com/explore/tags/{self.name}/",
+            page_prefetch=page_prefetch,
         )
 
 
@@ -2149,38 +2417,126 @@ class TitlePic:
 JsonExportable = Union[Post, Profile, StoryItem, Hashtag, FrozenNodeIterator]
 
 
-def get_json_structure(structure: JsonExportable) -> dict:
+METADATA_PROFILES = ('minimal', 'standard', 'full')
+
+# Fields kept by the 'minimal' metadata profile, enough to download the media again without further queries
+_MEDIA_MINIMAL_KEYS = {'__typename', 'id', 'shortcode', 'code', 'date', 'taken_at_timestamp', 'expiring_at_timestamp',
+                       'display_url', 'display_src', 'display_resources', 'is_video', 'video_url', 'video_resources',
+                       'edge_sidecar_to_children', 'owner', 'pinned_for_users'}
+# Fields added by the 'standard' metadata profile, i.e. those read by the properties of Post and StoryItem
+_MEDIA_STANDARD_KEYS = {'caption', 'edge_media_to_caption', 'title', 'accessibility_caption', 'location', 'comments',
+                        'edge_media_to_comment', 'edge_media_to_parent_comment', 'edge_media_preview_like', 'likes',
+                        'viewer_has_liked', 'edge_media_to_tagged_user', 'edge_media_to_sponsor_user',
+                        'video_duration', 'video_view_count', 'product_type', 'dimensions', 'is_sponsored'}
+_SIDECAR_NODE_KEYS = {'__typename', 'id', 'shortcode', 'display_url', 'display_resources', 'is_video', 'video_url'}
+_IPHONE_MINIMAL_KEYS = {'pk', 'id', 'code', 'media_type', 'taken_at', 'image_versions2', 'video_versions',
+                        'carousel_media'}
+_IPHONE_STANDARD_KEYS = {'caption', 'title', 'accessibility_caption', 'like_count', 'comment_count', 'has_liked',
+                         'view_count', 'video_duration', 'product_type', 'original_width', 'original_height',
+                         'usertags', 'location', 'user'}
+_PROFILE_MINIMAL_KEYS = {'id', 'pk', 'username', 'full_name', 'is_private', 'profile_pic_url', 'profile_pic_url_hd'}
+_PROFILE_COUNT_KEYS = {'edge_followed_by', 'edge_follow', 'edge_owner_to_timeline_media', 'edge_felix_video_timeline'}
+
+
+def _project(node: Dict[str, Any], keys: set) -> Dict[str, Any]:
+    return {key: value for key, value in node.items() if key in keys}
+
+
+def _project_profile(node: Dict[str, Any], metadata_profile: str) -> Dict[str, Any]:
+    if metadata_profile == 'minimal':
+        return _project(node, _PROFILE_MINIMAL_KEYS)
+    # Scalar fields and counts, without lists of related profiles, posts etc.
+    projected = {key: value for key, value in node.items()
+                 if not isinstance(value, (dict, list)) or key == 'iphone_struct'}
+    for key in _PROFILE_COUNT_KEYS & node.keys():
+        if isinstance(node[key], dict) and 'count' in node[key]:
+            projected[key] = {'count': node[key]['count']}
+    if 'iphone_struct' in projected:
+        projected['iphone_struct'] = _project(projected['iphone_struct'], _PROFILE_MINIMAL_KEYS)
+    return projected
+
+
+def _project_media(node: Dict[str, Any], metadata_profile: str) -> Dict[str, Any]:
+    """Project the node of a :class:`Post` or :class:`StoryItem`, without changing it."""
+    keys = _MEDIA_MINIMAL_KEYS if metadata_profile == 'minimal' else _MEDIA_MINIMAL_KEYS | _MEDIA_STANDARD_KEYS
+    projected = _project(node, keys)
+    if isinstance(projected.get('owner'), dict):
+        projected['owner'] = _project_profile(projected['owner'], 'minimal')
+    for key in ('edge_media_to_comment', 'edge_media_to_parent_comment', 'edge_media_preview_like'):
+        # Keep counts, without the previewed comments and likes
+        if isinstance(projected.get(key), dict) and 'count' in projected[key]:
+            projected[key] = {'count': projected[key]['count']}
+    with suppress(KeyError, TypeError):
+        projected['edge_sidecar_to_children'] = {'edges': [{'node': _project(edge['node'], _SIDECAR_NODE_KEYS)}
+                                                           for edge in node['edge_sidecar_to_children']['edges']]}
+    if 'iphone_struct' in node:
+        iphone_keys = (_IPHONE_MINIMAL_KEYS if metadata_profile == 'minimal'
+                       else _IPHONE_MINIMAL_KEYS | _IPHONE_STANDARD_KEYS)
+        iphone_struct = _project(node['iphone_struct'], iphone_keys)
+        if isinstance(iphone_struct.get('carousel_media'), list):
+            iphone_struct['carousel_media'] = [_project(media, _IPHONE_MINIMAL_KEYS)
+                                               for media in iphone_struct['carousel_media']]
+        if isinstance(iphone_struct.get('user'), dict):
+            iphone_struct['user'] = _project_profile(iphone_struct['user'], 'minimal')
+        projected['iphone_struct'] = iphone_struct
+    return projected
+
+
+def get_json_structure(structure: JsonExportable, metadata_profile: str = 'full') -> dict:
     """Returns Instaloader JSON structure for a :class:`Post`, :class:`Profile`, :class:`StoryItem`, :class:`Hashtag`
      or :class:`FrozenNodeIterator` so that it can be loaded by :func:`load_structure`.
 
     :param structure: :class:`Post`, :class:`Profile`, :class:`StoryItem` or :class:`Hashtag`
+    :param metadata_profile: Which fields of a :class:`Post`, :class:`StoryItem` or :class:`Profile` to include:
+       ``minimal`` keeps what is needed to download the media again from the loaded structure, ``standard`` also
+       keeps the fields read by the structure's properties (caption, likes, location etc.), and ``full`` everything
+       that has been retrieved.
 
     .. versionadded:: 4.8
+
+    .. versionchanged:: 4.15
+       Add `metadata_profile` parameter.
     """
+    if metadata_profile not in METADATA_PROFILES:
+        raise InvalidArgumentException("Metadata profile must be one of {}.".format(', '.join(METADATA_PROFILES)))
+    node = structure._asdict()
+    if metadata_profile != 'full':
+        if isinstance(structure, (Post, StoryItem)):
+            node = _project_media(node, metadata_profile)
+        elif isinstance(structure, Profile):
+            node = _project_profile(node, metadata_profile)
     return {
-        'node': structure._asdict(),
+        'node': node,
         'instaloader': {'version': __version__, 'node_type': structure.__class__.__name__}
     }
 
 
-def save_structure_to_file(structure: JsonExportable, filename: str) -> None:
+def save_structure_to_file(structure: JsonExportable, filename: str, compression_level: Optional[int] = None,
+                           metadata_profile: str = 'full') -> None:
     """Saves a :class:`Post`, :class:`Profile`, :class:`StoryItem`, :class:`Hashtag` or :class:`FrozenNodeIterator` to a
-    '.json' or '.json.xz' file such that it can later be loaded by :func:`load_structure_from_file`.
+    '.json', '.json.xz' or '.json.gz' file such that it can later be loaded by :func:`load_structure_from_file`.
 
-    If the specified filename ends in '.xz', the file will be LZMA compressed. Otherwise, a pretty-printed JSON file
-    will be created.
+    If the specified filename ends in '.xz' or '.gz', the file will be LZMA or gzip compressed. Otherwise, a
+    pretty-printed JSON file will be created.
 
     :param structure: :class:`Post`, :class:`Profile`, :class:`StoryItem` or :class:`Hashtag`
-    :param filename: Filename, ends in '.json' or '.json.xz'
+    :param filename: Filename, ends in '.json', '.json.xz' or '.json.gz'
+    :param compression_level: LZMA preset or gzip level (0-9), lower is faster; None for the default.
+    :param metadata_profile: Fields to include, see :func:`get_json_structure`.
+
+    .. versionchanged:: 4.15
+       Add gzip compression and `compression_level` and `metadata_profile` parameters.
     """
-    json_structure = get_json_structure(structure)
-    compress = filename.endswith('.xz')
-    if compress:
-        with lzma.open(filename, 'wt', check=lzma.CHECK_NONE) as fp:
-            json.dump(json_structure, fp=fp, separators=(',', ':'))
-    else:
-        with open(filename, 'wt') as fp:
-            json.dump(json_structure, fp=fp, indent=4, sort_keys=True)
+    jsoncodec.write_file(filename, serialize_structure(structure, filename, metadata_profile), compression_level)
+
+
+def serialize_structure(structure: JsonExportable, filename: str, metadata_profile: str = 'full') -> str:
+    """Serializes a structure as it is written to the given file by :func:`save_structure_to_file`, i.e. compact
+    for compressed files and pretty-printed otherwise.
+
+    .. versionadded:: 4.15"""
+    return jsoncodec.dumps(get_json_structure(structure, metadata_profile),
+                           pretty=not jsoncodec.is_compressed(filename))
 
 
 def load_structure(context: InstaloaderContext, json_structure: dict) -> JsonExportable:
@@ -2215,17 +2571,12 @@ def load_structure(context: InstaloaderContext, json_structure: dict) -> JsonExp
 
 def load_structure_from_file(context: InstaloaderContext, filename: str) -> JsonExportable:
     """Loads a :class:`Post`, :class:`Profile`, :class:`StoryItem`, :class:`Hashtag` or :class:`FrozenNodeIterator` from
-    a '.json' or '.json.xz' file that has been saved by :func:`save_structure_to_file`.
+    a '.json', '.json.xz' or '.json.gz' file that has been saved by :func:`save_structure_to_file`.
 
     :param context: :attr:`Instaloader.context` linked to the new object, used for additional queries if necessary.
-    :param filename: Filename, ends in '.json' or '.json.xz'
+    :param filename: Filename, usually ending in '.json', '.json.xz' or '.json.gz'
+
+    .. versionchanged:: 4.15
+       The compression is detected from the file's content.
     """
-    compressed = filename.endswith('.xz')
-    if compressed:
-        fp = lzma.open(filename, 'rt')
-    else:
-        # pylint:disable=consider-using-with
-        fp = open(filename, 'rt')
-    json_structure = json.load(fp)
-    fp.close()
-    return load_structure(context, json_structure)
+    return load_structure(context, jsoncodec.load_file(filename))
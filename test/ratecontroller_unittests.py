@@ -0,0 +1,93 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import instastorysaver
+import instastorysaver.instastorysavercontext
+
+SLIDING_WINDOW = 660
+QUERIES_PER_WINDOW = 5
+# Few enough queries to all be tracked within the hour the controller remembers
+THREADS = 8
+QUERIES_PER_THREAD = 3
+
+
+class FastClock:
+    """Clock running *speedup* times faster than real time, for the sliding windows to pass within the test."""
+
+    def __init__(self, speedup: float = 10000):
+        self.speedup = speedup
+        self._start = time.monotonic()
+
+    def monotonic(self) -> float:
+        return (time.monotonic() - self._start) * self.speedup
+
+    def sleep(self, secs: float):
+        time.sleep(secs / self.speedup)
+
+
+class StressRateController(instastorysaver.RateController):
+    def __init__(self, context, clock: FastClock):
+        super().__init__(context)
+        self.clock = clock
+
+    def sleep(self, secs: float):
+        self.clock.sleep(secs)
+
+    def count_per_sliding_window(self, query_type: str) -> int:
+        return QUERIES_PER_WINDOW if query_type == 'other' else super().count_per_sliding_window(query_type)
+
+
+class NoSleepRateController(instastorysaver.RateController):
+    def sleep(self, secs: float):
+        pass
+
+    def count_per_sliding_window(self, query_type: str) -> int:
+        return 1 if query_type == 'other' else super().count_per_sliding_window(query_type)
+
+
+class FixedDelayRateController(NoSleepRateController):
+    def query_waittime(self, query_type: str, current_time: float, untracked_queries: bool = False) -> float:
+        return 30.0
+
+
+class TestRateController(unittest.TestCase):
+    def assertQueriesReturn(self, controller: instastorysaver.RateController, count: int = 3):
+        thread = threading.Thread(target=lambda: [controller.wait_before_query('other') for _ in range(count)],
+                                  daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive(), "wait_before_query did not return")
+
+    def test_sleep_without_waiting(self):
+        self.assertQueriesReturn(NoSleepRateController(mock.Mock()))
+
+    def test_fixed_query_waittime(self):
+        self.assertQueriesReturn(FixedDelayRateController(mock.Mock()))
+
+    def test_concurrent_queries_stay_within_window(self):
+        clock = FastClock()
+        controller = StressRateController(mock.Mock(), clock)
+        barrier = threading.Barrier(THREADS)
+
+        def worker():
+            barrier.wait()
+            for _ in range(QUERIES_PER_THREAD):
+                controller.wait_before_query('other')
+
+        with mock.patch.object(instastorysaver.instastorysavercontext, 'time', clock):
+            threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # pylint:disable=protected-access
+        timestamps = sorted(controller._query_timestamps['other'])
+        self.assertEqual(len(timestamps), THREADS * QUERIES_PER_THREAD)
+        for earlier, later in zip(timestamps, timestamps[QUERIES_PER_WINDOW:]):
+            self.assertGreaterEqual(later - earlier, SLIDING_WINDOW)
+
+
+if __name__ == '__main__':
+    unittest.main()